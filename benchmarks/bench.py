@@ -0,0 +1,252 @@
+"""
+Headless benchmarks of the synth components and of the
+PolySynth render path, no MIDI or audio device is needed.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench --out bench.json
+
+The results are written as JSON so they can be compared
+across commits.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from pathlib import Path
+import numpy as np
+
+from synth import PolySynth
+from synth.backends import NullMidiInput, NullOutput
+from synth.voices import VoiceManager
+from synth.components import (
+    SineOscillator,
+    SquareOscillator,
+    SawtoothOscillator,
+    TriangleOscillator,
+    WavetableOscillator,
+    ModulatedOscillator,
+    ADSREnvelope,
+    Chain,
+    WaveAdder,
+    Panner,
+    Volume,
+)
+
+SAMPLE_RATE = 44_100
+BLOCK_SIZES = (64, 256, 1024)
+
+
+def amp_mod(init_amp, env):
+    return env * init_amp
+
+
+def freq_mod(init_freq, val):
+    return init_freq * (1 + val * 0.01)
+
+
+def get_voice(freq=440, amp=1, sample_rate=SAMPLE_RATE):
+    # A typical patch, an enveloped oscillator with vibrato, panned.
+    return iter(
+        Chain(
+            ModulatedOscillator(
+                SineOscillator(freq, amp=amp, sample_rate=sample_rate),
+                ADSREnvelope(0.01, 0.1, 0.7, 0.3, sample_rate=sample_rate),
+                SineOscillator(5, sample_rate=sample_rate),
+                amp_mod=amp_mod,
+                freq_mod=freq_mod,
+            ),
+            Panner(0.4),
+            Volume(0.8),
+        )
+    )
+
+
+COMPONENTS = {
+    "SineOscillator": lambda: SineOscillator(440),
+    "SquareOscillator": lambda: SquareOscillator(440),
+    "SawtoothOscillator": lambda: SawtoothOscillator(440),
+    "TriangleOscillator": lambda: TriangleOscillator(440),
+    "WavetableOscillator": lambda: WavetableOscillator(440, waveform="sawtooth"),
+    "ModulatedOscillator": lambda: ModulatedOscillator(
+        SineOscillator(440), SineOscillator(5), freq_mod=freq_mod
+    ),
+    "ADSREnvelope": lambda: ADSREnvelope(0.05, 0.2, 0.7, 0.3),
+    "Chain": lambda: Chain(SineOscillator(440), Panner(0.4), Volume(0.8)),
+    "WaveAdder": lambda: WaveAdder(
+        SineOscillator(440), SawtoothOscillator(220), TriangleOscillator(110)
+    ),
+}
+
+
+def _rate(fn, samples, min_time):
+    # Returns the samples per second of `fn`, which generates
+    # `samples` samples per call, repeated for at least `min_time` s.
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls * samples / elapsed
+
+
+def bench_components(min_time):
+    results = {}
+    for name, make in COMPONENTS.items():
+        gen = iter(make())
+        res = {"next": _rate(lambda: next(gen), 1, min_time)}
+        for n in BLOCK_SIZES:
+            if hasattr(gen, "next_block"):
+                res[f"block_{n}"] = _rate(lambda: gen.next_block(n), n, min_time)
+        results[name] = res
+    return results
+
+
+def bench_voice_memory(count=256):
+    """
+    Returns the bytes allocated per voice of `get_voice`, the
+    Python objects of the voice and the state they hold.
+    """
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    voices = [get_voice(110 * 2 ** (k % 36 / 12), 0.5) for k in range(count)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return {"voices": len(voices), "bytes_per_voice": size / count}
+
+
+def _buffer_time(num_samples, voices, reps):
+    # Median time taken by PolySynth._get_samples for a buffer.
+    nchannels = np.size(next(get_voice()))
+    synth = PolySynth(
+        num_samples=num_samples, midi_input=NullMidiInput(), audio_output=NullOutput()
+    )
+    synth._init_stream(nchannels)
+    manager = VoiceManager(get_voice)
+    for k in range(voices):
+        manager.notes[k] = [get_voice(110 * 2 ** (k % 36 / 12), 0.5), False, 1.0, 1.0]
+    times = []
+    for _ in range(reps):
+        start = time.perf_counter()
+        PolySynth._get_samples(synth, manager)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def bench_max_voices(num_samples, reps, limit):
+    """
+    Returns the largest number of voices for which the median time of
+    rendering a buffer stays within the buffer deadline.
+    """
+    deadline = num_samples / SAMPLE_RATE
+    fits = lambda v: _buffer_time(num_samples, v, reps) < deadline
+
+    lo, hi = 0, 1
+    while hi <= limit and fits(hi):
+        lo, hi = hi, hi * 2
+    hi = min(hi, limit + 1)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        lo, hi = (mid, hi) if fits(mid) else (lo, mid)
+
+    return {
+        "deadline_ms": deadline * 1000,
+        "max_voices": lo,
+        "buffer_ms_at_max": _buffer_time(num_samples, lo, reps) * 1000 if lo else None,
+    }
+
+
+# Imports `module` in a new interpreter, prints the seconds it took, the
+# peak resident memory in KiB (bytes on macOS) and the heavy modules loaded.
+IMPORT_CODE = """
+import sys, time, resource
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = [m for m in ("pygame", "pyaudio") if m in sys.modules]
+print(elapsed, rss, ",".join(heavy))
+"""
+
+
+def _import_time(module, runs):
+    root = Path(__file__).resolve().parents[1]
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_CODE.format(module=module)],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=root,
+        )
+        elapsed, rss, heavy = (out.stdout.strip().split(" ") + [""])[:3]
+        results.append((float(elapsed), int(rss), heavy))
+    return {
+        "seconds": float(np.median([r[0] for r in results])),
+        "max_rss_kib": int(np.median([r[1] for r in results])),
+        "heavy_modules": [m for m in results[-1][2].split(",") if m],
+    }
+
+
+def bench_import(runs=5):
+    """
+    Returns the cold start time and memory of importing synth and,
+    as the baseline it builds on, numpy, each in a new interpreter.
+    """
+    return {module: _import_time(module, runs) for module in ("numpy", "synth")}
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(min_time=0.2, reps=20, limit=512):
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "sample_rate": SAMPLE_RATE,
+        },
+        "import": bench_import(),
+        "components": bench_components(min_time),
+        "voice_memory": bench_voice_memory(),
+        "polysynth": {str(n): bench_max_voices(n, reps, limit) for n in BLOCK_SIZES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default=None, help="path of the JSON output")
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds per component timing"
+    )
+    parser.add_argument("--reps", type=int, default=20, help="buffers per timing")
+    parser.add_argument("--limit", type=int, default=512, help="max voices to try")
+    args = parser.parse_args()
+
+    results = json.dumps(run(args.min_time, args.reps, args.limit), indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,5 @@
 from .player import PolySynth
+from .renderer import OfflineRenderer
+from .freeze import FrozenPatch
+from .tuning import Tuning
+from .stream import StreamRenderer
@@ -0,0 +1,282 @@
+"""
+MIDI input and audio output backends of PolySynth.
+
+The MIDI inputs have the interface of `pygame.midi.Input` (`poll`,
+`read` and `close`) and the audio outputs have an `open` method with
+the signature of `PyAudio.open` that returns a stream with `write`,
+`is_active` and `close`. pygame and pyaudio are only imported when
+the backends that use them are created.
+"""
+
+import time
+import threading
+from collections import deque
+import numpy as np
+from .stream import PCMWriter
+
+# Same values as pyaudio.paInt16, paContinue, paOutputUnderflow
+# and paOutputUnderflowed, the error code of a blocking write.
+PA_INT16 = 8
+PA_CONTINUE = 0
+PA_OUTPUT_UNDERFLOW = 4
+PA_OUTPUT_UNDERFLOWED = -9980
+
+
+def read_events(path):
+    """
+    Reads MIDI events from a text file with one event per line of
+    the form `time status note vel`, `time` being in seconds, in the
+    format of the events of `OfflineRenderer.render`. The status may
+    be written in hex (0x90), lines starting with # are ignored.
+    """
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            t, status, note, vel = line.split()[:4]
+            events.append((float(t), int(status, 0), int(note), int(vel)))
+    return events
+
+
+class NullMidiInput:
+    """
+    MIDI input without any events.
+    """
+
+    def poll(self):
+        return False
+
+    def read(self, num_events):
+        return []
+
+    def close(self):
+        pass
+
+
+class QueueMidiInput(NullMidiInput):
+    """
+    MIDI input fed from code through `.send`, it can
+    be fed from another thread than the one playing.
+    """
+
+    def __init__(self, maxlen=1024):
+        """
+        maxlen : maximum number of pending events, if the queue
+            is full the oldest event is dropped.
+        """
+        self.events = deque(maxlen=maxlen)
+
+    def send(self, status, note, vel, timestamp=0):
+        """
+        Queues a MIDI message, `timestamp` is in ms.
+        """
+        self.events.append([[status, note, vel, 0], timestamp])
+
+    def poll(self):
+        return bool(self.events)
+
+    def read(self, num_events):
+        events = self.events
+        return [events.popleft() for _ in range(min(num_events, len(events)))]
+
+
+class FileMidiInput(QueueMidiInput):
+    """
+    MIDI input that plays back the events of a file read with
+    `read_events`, each event is received once its time has
+    passed since the first poll.
+    """
+
+    def __init__(self, path):
+        super().__init__(maxlen=None)
+        self._pending = sorted(read_events(path), key=lambda e: e[0])
+        self._pending.reverse()
+        self._start = None
+
+    def poll(self):
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now
+        elapsed = now - self._start
+        pending = self._pending
+        while pending and pending[-1][0] <= elapsed:
+            t, status, note, vel = pending.pop()
+            self.send(status, note, vel, int(t * 1000))
+        return super().poll()
+
+
+class PygameMidiInput:
+    """
+    MIDI input from a device through `pygame.midi`.
+    """
+
+    def __init__(self, device_id=None):
+        """
+        device_id : id of the input device, the default one if None.
+        """
+        from pygame import midi
+
+        midi.init()
+        if midi.get_count() > 0:
+            if device_id is None:
+                device_id = midi.get_default_input_id()
+            self.input = midi.Input(device_id)
+        else:
+            raise Exception("no midi devices detected")
+
+    def poll(self):
+        return self.input.poll()
+
+    def read(self, num_events):
+        return self.input.read(num_events)
+
+    def close(self):
+        self.input.close()
+
+
+class _Stream:
+    """
+    Output stream that hands the buffers to the `write` of its
+    output. With a `stream_callback` the buffers are pulled from
+    it on a thread until it returns a flag other than paContinue.
+    If `realtime`, a buffer is taken only as often as a device
+    at the sample rate would take it.
+    """
+
+    def __init__(self, output, rate, channels, frames_per_buffer, stream_callback):
+        self.output = output
+        self.rate = rate
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.stream_callback = stream_callback
+        self._next = time.perf_counter()
+        self._active = True
+        self._thread = None
+        if stream_callback is not None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _wait(self, num_frames):
+        # Sleeps until the device would have played `num_frames`.
+        self._next += num_frames / self.rate
+        delay = self._next - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _run(self):
+        frames = self.frames_per_buffer
+        while self._active:
+            samples, flag = self.stream_callback(None, frames, {}, 0)
+            self.write(samples, frames)
+            if flag != PA_CONTINUE:
+                self._active = False
+
+    def write(self, samples, num_frames=None, exception_on_underflow=False):
+        if not isinstance(samples, np.ndarray):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        samples = samples.reshape(-1, self.channels)
+        self.output.write(samples)
+        if self.output.realtime:
+            self._wait(len(samples))
+
+    def is_active(self):
+        return self._active
+
+    def close(self):
+        self._active = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.output.close()
+
+
+class NullOutput:
+    """
+    Audio output that discards the samples.
+    """
+
+    def __init__(self, realtime=False):
+        """
+        realtime : if True writes block, and the stream callback is
+            called, at the rate of a device, else as fast as possible.
+        """
+        self.realtime = realtime
+
+    def open(
+        self,
+        rate,
+        channels,
+        format=PA_INT16,
+        output=True,
+        frames_per_buffer=1024,
+        stream_callback=None,
+    ):
+        self.rate = rate
+        self.channels = channels
+        return _Stream(self, rate, channels, frames_per_buffer, stream_callback)
+
+    def write(self, samples):
+        pass
+
+    def close(self):
+        pass
+
+
+class MemoryOutput(NullOutput):
+    """
+    Audio output that keeps the samples in memory, `.samples()`
+    returns them as an int16 array of shape (frames, channels).
+    """
+
+    def __init__(self, realtime=False):
+        super().__init__(realtime)
+        self.buffers = []
+
+    def write(self, samples):
+        # The buffers written by PolySynth are reused, so they are copied.
+        self.buffers.append(samples.copy())
+
+    def samples(self):
+        if not self.buffers:
+            return np.zeros((0, getattr(self, "channels", 1)), dtype=np.int16)
+        return np.concatenate(self.buffers)
+
+
+class WavOutput(NullOutput):
+    """
+    Audio output that writes the samples to a 16 bit PCM WAV file.
+    """
+
+    def __init__(self, path, realtime=False):
+        super().__init__(realtime)
+        self.path = path
+        self._file = None
+
+    def open(self, rate, channels, *args, **kwargs):
+        self._file = PCMWriter(self.path, channels, rate)
+        return super().open(rate, channels, *args, **kwargs)
+
+    def write(self, samples):
+        self._file.write(samples)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class PyAudioOutput:
+    """
+    Audio output to the default device through PyAudio.
+    """
+
+    def __init__(self):
+        self.pyaudio = None
+
+    def open(self, **kwargs):
+        import pyaudio
+
+        if self.pyaudio is None:
+            self.pyaudio = pyaudio.PyAudio()
+        return self.pyaudio.open(**kwargs)
@@ -1,8 +1,12 @@
 from .oscillators import SineOscillator, SquareOscillator
 from .oscillators import SawtoothOscillator, TriangleOscillator
 from .oscillators import ModulatedOscillator
+from .oscillators import WavetableOscillator
 from .envelopes import ADSREnvelope
 from .composers import Chain, WaveAdder
 from .modifiers import Volume, ModulatedVolume
 from .modifiers import Panner, ModulatedPanner
 from .modifiers import Clipper
+from .control import ControlRate, set_default_control_rate
+from .compiler import compile_patch, RenderPlan
+from .bus import ModulationBus
@@ -0,0 +1,77 @@
+"""
+Helpers for the block mode of the components, where
+a component returns `n` samples at a time as a contiguous
+float32 array of shape (n,) for mono or (n, 2) for stereo
+instead of one value per __next__ call.
+
+Components declare the number of channels of their
+output with a `channels` attribute, modifiers with an
+`out_channels(channels)` method.
+"""
+
+import numpy as np
+
+# Sample type of the blocks passed through the components.
+DTYPE = np.float32
+
+
+def render_block(generator, n):
+    """
+    Returns the next `n` values of the generator as a numpy
+    array, uses `next_block` when the generator implements it
+    else falls back to calling __next__ `n` times.
+    """
+    if hasattr(generator, "next_block"):
+        return generator.next_block(n)
+    return np.array([next(generator) for _ in range(n)], dtype=DTYPE)
+
+
+def get_channels(component):
+    """
+    Returns the number of channels declared by the
+    component, None if it does not declare them.
+    """
+    return getattr(component, "channels", None)
+
+
+def get_state(component):
+    """
+    Returns the state of the component from its `get_state`,
+    None for components without a state, such as Clipper.
+    """
+    if hasattr(component, "get_state"):
+        return component.get_state()
+    return None
+
+
+def set_state(component, state):
+    """
+    Restores a state returned by `get_state` into the component.
+    """
+    if state is not None:
+        component.set_state(state)
+
+
+def supports_blocks(component):
+    """
+    Returns True if the component can advance a whole block at
+    once, components that only implement __next__ return False.
+    """
+    return hasattr(component, "next_block") or not hasattr(component, "__next__")
+
+
+def modify_block(modifier, block):
+    """
+    Returns the block modified by `modifier`. Modifiers that only work
+    on single values, such as functions that use `max` or `math`, are
+    called with each value of the block as on the per sample path.
+    """
+    try:
+        val = modifier(block)
+    except (TypeError, ValueError):
+        val = None
+    if isinstance(val, np.ndarray):
+        return val
+    if block.ndim == 2:
+        return np.array([modifier(tuple(v)) for v in block.tolist()], dtype=DTYPE)
+    return np.array([modifier(v) for v in block.tolist()], dtype=DTYPE)
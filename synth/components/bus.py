@@ -0,0 +1,186 @@
+"""
+Modulation sources that are shared by the voices, such as a global
+LFO, so that they are computed once instead of once per voice.
+"""
+
+import numpy as np
+from .blocks import DTYPE, render_block
+from .control import with_control_rate
+from .state import ReaderState
+
+
+class SharedSource:
+    """
+    A modulator whose values are computed once for all of its readers.
+
+    The source keeps the values from the frame the slowest reader may
+    still read up to the last frame computed, when it is ticked or a
+    reader needs frames beyond them at least `block` more frames are
+    computed. Readers are expected to read the same frames in turn, as
+    the voices do when they are mixed, a reader can't fall behind by
+    more than `block` frames.
+    """
+
+    def __init__(self, source, block=64):
+        """
+        source : the modulator, any kind of generator.
+        block : least number of frames computed at a time.
+        """
+        self.source = source
+        self.block = block
+        self.reset()
+
+    def reset(self):
+        iter(self.source)
+        self._vals = np.empty(0, dtype=DTYPE)
+        self._start = 0
+        self._end = 0
+        self.now = 0
+
+    def _extend(self, stop):
+        # Computes the values up to frame `stop`.
+        count = max(stop - self._end, self.block)
+        new = np.asarray(render_block(self.source, count), dtype=DTYPE)
+        keep = self._vals[max(len(self._vals) - self.block, 0) :]
+        self._vals = np.concatenate((keep, new))
+        self._vals.flags.writeable = False
+        self._start = self._end - len(keep)
+        self._end += count
+
+    def tick(self, frame, n):
+        """
+        Computes the values of the `n` frames from `frame`, the
+        frame new readers start from.
+        """
+        if frame + n > self._end:
+            self._extend(frame + n)
+        self.now = frame
+
+    def read(self, t, n):
+        """
+        Returns the values of the frames `t` to `t + n`.
+        """
+        if t + n > self._end:
+            self._extend(t + n)
+        if t < self._start:
+            raise ValueError("reader is too far behind the shared source")
+
+        self.now = max(self.now, t + n)
+        i = t - self._start
+        return self._vals[i : i + n]
+
+
+class BusReader:
+    """
+    Modulator that reads the values of a shared source, used in place
+    of the source in ModulatedOscillator, ModulatedVolume etc.
+
+    A reader starts from the frame the source is at when it is iterated,
+    so all the readers of a source read the same values at the same time
+    and the source isn't reset on note on.
+    """
+
+    channels = 1
+
+    # Shared sources are evaluated at their own control rate.
+    shared = True
+
+    __slots__ = ("source", "_t")
+
+    def __init__(self, source):
+        """
+        source : instance of SharedSource.
+        """
+        self.source = source
+        self._t = 0
+
+    def __iter__(self):
+        self._t = self.source.now
+        return self
+
+    def get_state(self):
+        return ReaderState(self._t)
+
+    def set_state(self, state):
+        self._t = state.frame
+
+    def __next__(self):
+        val = self.source.read(self._t, 1)[0]
+        self._t += 1
+        return float(val)
+
+    def next_block(self, n):
+        val = self.source.read(self._t, n)
+        self._t += n
+        return val
+
+
+class ModulationBus:
+    """
+    Named modulation sources shared by the voices. A source is computed
+    once for every block of frames and read by any number of voices
+    through the readers returned by `.reader(name)`, which are passed to
+    the modulated components of a voice like any other modulator.
+
+    A bus passed to PolySynth, OfflineRenderer or a VoiceManager is
+    ticked once per buffer, so its sources advance with the buffers
+    whether or not a voice reads them, and the readers of a voice start
+    from the frame of its note on. A bus that isn't ticked advances its
+    sources as they are read.
+
+    Modulators that should restart on every note on are passed to the
+    components directly instead, as before.
+    """
+
+    def __init__(self, block=64):
+        """
+        block : least number of frames of a source computed at a
+            time, typically the number of frames in a buffer.
+        """
+        self.block = block
+        self.sources = {}
+        self.frame = 0
+        self._next_frame = 0
+
+    def add(self, name, source, control_rate=None):
+        """
+        Adds the modulator `source` to the bus as `name`.
+
+        control_rate : if above 1 the source is evaluated once every
+            `control_rate` samples, see `ControlRate`.
+        """
+        source = with_control_rate(source, control_rate)
+        self.sources[name] = SharedSource(source, self.block)
+
+    def reader(self, name):
+        """
+        Returns a new reader of the source `name`.
+        """
+        return BusReader(self.sources[name])
+
+    def tick(self, n):
+        """
+        Advances the sources to the next buffer of `n` frames,
+        called before the voices of the buffer are rendered.
+        """
+        self.frame = self._next_frame
+        self._next_frame += n
+        for source in self.sources.values():
+            source.tick(self.frame, n)
+
+    def set_offset(self, offset):
+        """
+        Sets the frame new readers start from to `offset`
+        frames into the buffer of the last tick.
+        """
+        for source in self.sources.values():
+            source.now = self.frame + offset
+
+    def reset(self):
+        """
+        Restarts all the sources from their first value.
+        """
+        self.frame = 0
+        self._next_frame = 0
+        for source in self.sources.values():
+            source.reset()
@@ -0,0 +1,227 @@
+"""
+Compiles a patch built from the components into a flat render plan,
+an ordered list of operations that render a block each. The attribute
+lookups, `hasattr` probes and branches that the components resolve
+for every sample or block are resolved once when the plan is built.
+
+A voice is compiled by returning `iter(compile_patch(patch, num_samples))`
+from the `osc_function` passed to the player, with `num_samples` being
+the buffer size of the player.
+"""
+
+import numpy as np
+from .blocks import DTYPE, modify_block, render_block, supports_blocks
+from .composers import Chain, WaveAdder
+from .modifiers import Volume, Panner, Clipper
+from .oscillators import ModulatedOscillator
+from .oscillators.base_oscillator import Oscillator
+
+
+def compile_patch(component, num_samples):
+    """
+    Returns a RenderPlan of the component for blocks of `num_samples`.
+    """
+    return RenderPlan(component, num_samples)
+
+
+class RenderPlan:
+    """
+    A compiled patch that can be used in place of the component it was
+    compiled from. `next_block(num_samples)` runs the plan, other block
+    sizes and __next__ fall back to the component, attributes such as
+    `trigger_release` and `ended` are those of the component.
+
+    The plan shares its state with the component, so the patch should
+    not be restructured after it is compiled. The array returned by
+    `next_block` may be reused by the plan on the next call.
+    """
+
+    __slots__ = ("component", "num_samples", "_ops", "_slots", "_buffers", "_out")
+
+    def __init__(self, component, num_samples):
+        """
+        component : the root component of the patch.
+        num_samples : the size of the blocks the plan renders.
+        """
+        self.component = component
+        self.num_samples = num_samples
+        self._ops = []
+        self._slots = []
+        self._buffers = {}
+        self._out = self._compile(component)
+
+    def __getattr__(self, attr):
+        if attr in RenderPlan.__slots__:
+            raise AttributeError(attr)
+        return getattr(self.component, attr)
+
+    def __iter__(self):
+        iter(self.component)
+        return self
+
+    def __next__(self):
+        return next(self.component)
+
+    def next_block(self, n):
+        if n != self.num_samples:
+            return render_block(self.component, n)
+        for op in self._ops:
+            op()
+        return self._slots[self._out]
+
+    def _new_slot(self):
+        self._slots.append(None)
+        return len(self._slots) - 1
+
+    def _buffer(self, key, shape):
+        # Returns the preallocated buffer `key`, it is allocated when it
+        # is first needed and again only if the shape of its input changes.
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != shape:
+            buf = self._buffers[key] = np.empty(shape, dtype=DTYPE)
+        return buf
+
+    def _compile(self, component):
+        # Appends the ops rendering `component` and
+        # returns the index of the slot of its output.
+        if isinstance(component, RenderPlan):
+            return self._compile(component.component)
+        elif isinstance(component, Chain):
+            if all(supports_blocks(mod) for mod in component.modifiers):
+                return self._compile_chain(component)
+        elif isinstance(component, WaveAdder):
+            return self._compile_wave_adder(component)
+        elif isinstance(component, ModulatedOscillator) and isinstance(
+            component.oscillator, Oscillator
+        ):
+            return self._compile_modulated_oscillator(component)
+        return self._compile_generator(component)
+
+    def _compile_generator(self, gen):
+        slots, n, out = self._slots, self.num_samples, self._new_slot()
+        if hasattr(gen, "next_block"):
+            next_block = gen.next_block
+
+            def op():
+                slots[out] = next_block(n)
+
+        else:
+
+            def op():
+                slots[out] = render_block(gen, n)
+
+        self._ops.append(op)
+        return out
+
+    def _compile_modulated_oscillator(self, mosc):
+        slots, n, out = self._slots, self.num_samples, self._new_slot()
+        mods = [self._compile(m) for m in mosc.modulators]
+        osc = mosc.oscillator
+        modulated_block = osc.modulated_block
+        apply_mod = mosc._apply_mod
+
+        # (parameter, mod function, initial value getter, modulator slot)
+        params = []
+        for name in ("amp", "freq", "phase"):
+            mod_fn = getattr(mosc, f"{name}_mod")
+            if mod_fn is not None:
+                init = getattr(type(osc), f"init_{name}").fget
+                params.append((name, mod_fn, init, mods[mosc._mod_index(name)]))
+
+        def op():
+            kwargs = {
+                name: apply_mod(mod_fn, init(osc), slots[slot], n)
+                for name, mod_fn, init, slot in params
+            }
+            slots[out] = modulated_block(n, **kwargs)
+
+        self._ops.append(op)
+        return out
+
+    def _compile_chain(self, chain):
+        slots, n = self._slots, self.num_samples
+        out = self._compile(chain.generator)
+        for mod in chain.modifiers:
+            if hasattr(mod, "__iter__"):
+                next_block = mod.next_block
+                self._ops.append(lambda next_block=next_block: next_block(n))
+
+        for i, mod in enumerate(chain.modifiers):
+            src, out = out, self._new_slot()
+            key = (id(chain), i)
+            if isinstance(mod, Volume):
+                op = self._volume_op(mod, src, out, key)
+            elif isinstance(mod, Panner):
+                op = self._panner_op(mod, src, out, key)
+            elif isinstance(mod, Clipper):
+                op = self._clipper_op(mod, src, out, key)
+            else:
+
+                def op(mod=mod, src=src, out=out):
+                    slots[out] = modify_block(mod, slots[src])
+
+            self._ops.append(op)
+        return out
+
+    def _volume_op(self, mod, src, out, key):
+        slots = self._slots
+
+        def op():
+            val = slots[src]
+            amp = mod.amp
+            if isinstance(amp, np.ndarray) and val.ndim == 2:
+                amp = amp[:, None]
+            slots[out] = np.multiply(val, amp, out=self._buffer(key, val.shape))
+
+        return op
+
+    def _panner_op(self, mod, src, out, key):
+        slots = self._slots
+
+        def op():
+            val = slots[src]
+            if val.ndim != 1:
+                slots[out] = mod(val)
+                return
+            buf = self._buffer(key, (len(val), 2))
+            r = mod.r * 2
+            np.multiply(val, 2 - r, out=buf[:, 0])
+            np.multiply(val, r, out=buf[:, 1])
+            slots[out] = buf
+
+        return op
+
+    def _clipper_op(self, mod, src, out, key):
+        slots = self._slots
+        mi, ma = mod.wave_range
+
+        def op():
+            val = slots[src]
+            # Stereo values are clipped at twice the range,
+            # same as clipping half the value.
+            lo, hi = (2 * mi, 2 * ma) if val.ndim == 2 else (mi, ma)
+            slots[out] = np.clip(val, lo, hi, out=self._buffer(key, val.shape))
+
+        return op
+
+    def _compile_wave_adder(self, adder):
+        slots, n, out = self._slots, self.num_samples, self._new_slot()
+        srcs = [self._compile(gen) for gen in adder.generators]
+        stereo = adder.stereo
+        acc = np.empty((n, 2) if stereo else n, dtype=DTYPE)
+        scale = 1 / len(srcs)
+
+        def op():
+            acc.fill(0)
+            for src in srcs:
+                val = slots[src]
+                if val.ndim == 1 and stereo:
+                    val = val[:, None]
+                elif val.ndim == 2 and not stereo:
+                    val = val.mean(axis=1)
+                np.add(acc, val, out=acc)
+            np.multiply(acc, scale, out=acc)
+            slots[out] = acc
+
+        self._ops.append(op)
+        return out
@@ -3,7 +3,11 @@ Components that help in composing combinations of generators and modifiers
 to generate waves of different kinds.
 """
 
+import numpy as np
 from collections.abc import Iterable
+from .blocks import DTYPE, get_channels, get_state, render_block, set_state
+from .blocks import modify_block, supports_blocks
+from .state import ChainState, WaveAdderState
 
 
 class Chain:
@@ -14,6 +18,8 @@ class Chain:
     For sequential composition of waves.
     """
 
+    __slots__ = ("generator", "modifiers", "channels", "_iterated", "_enders", "_ended")
+
     def __init__(self, generator, *modifiers):
         """
         generator : instance of an Oscillator or
@@ -26,8 +32,29 @@ class Chain:
         """
         self.generator = generator
         self.modifiers = modifiers
+        self.channels = self._get_channels()
+        # Modifiers that are advanced along with the generator.
+        self._iterated = tuple(mod for mod in modifiers if hasattr(mod, "__iter__"))
+
+        # Components that signal the end of the chain, `.ended` is
+        # latched once they all have ended until the next __iter__.
+        self._enders = [c for c in (generator, *modifiers) if hasattr(c, "ended")]
+        self._ended = False
+
+    def _get_channels(self):
+        # Channels of the output, None if they aren't known because
+        # a modifier doesn't declare `out_channels`, in which case
+        # they are found from a sample of the chain.
+        channels = get_channels(self.generator)
+        for modifier in self.modifiers:
+            if channels is None or not hasattr(modifier, "out_channels"):
+                return None
+            channels = modifier.out_channels(channels)
+        return channels
 
     def __getattr__(self, attr):
+        if attr in Chain.__slots__:
+            raise AttributeError(attr)
         val = None
         if hasattr(self.generator, attr):
             val = getattr(self.generator, attr)
@@ -40,6 +67,10 @@ class Chain:
                 raise AttributeError(f"attribute '{attr}' does not exist")
         return val
 
+    def retune(self, ratio, tuning=None):
+        if hasattr(self.generator, "retune"):
+            self.generator.retune(ratio, tuning)
+
     def trigger_release(self):
         tr = "trigger_release"
         if hasattr(self.generator, tr):
@@ -50,25 +81,56 @@ class Chain:
 
     @property
     def ended(self):
-        ended = []
-        e = "ended"
-        if hasattr(self.generator, e):
-            ended.append(self.generator.ended)
-        ended.extend([m.ended for m in self.modifiers if hasattr(m, e)])
-        return all(ended)
+        if not self._ended:
+            self._ended = all(c.ended for c in self._enders)
+        return self._ended
+
+    def get_state(self):
+        return ChainState(
+            get_state(self.generator),
+            [get_state(mod) for mod in self.modifiers],
+            self._ended,
+        )
+
+    def set_state(self, state):
+        set_state(self.generator, state.generator)
+        for mod, mod_state in zip(self.modifiers, state.modifiers):
+            set_state(mod, mod_state)
+        self._ended = state.ended
 
     def __iter__(self):
         iter(self.generator)
-        [iter(mod) for mod in self.modifiers if hasattr(mod, "__iter__")]
+        [iter(mod) for mod in self._iterated]
+        self._ended = False
         return self
 
     def __next__(self):
         val = next(self.generator)
-        [next(mod) for mod in self.modifiers if hasattr(mod, "__iter__")]
+        for mod in self._iterated:
+            next(mod)
         for modifier in self.modifiers:
             val = modifier(val)
         return val
 
+    def next_block(self, n):
+        """
+        Returns the next `n` values as an array of shape (n,) or (n, 2).
+
+        Modifiers that are iterated but don't implement `next_block`
+        can't be advanced a block at a time, in which case the whole
+        chain falls back to the per sample path. Modifiers that are
+        functions of single values are called for each value of the
+        block, see `modify_block`.
+        """
+        if not all(supports_blocks(mod) for mod in self.modifiers):
+            return np.array([next(self) for _ in range(n)], dtype=DTYPE)
+
+        val = render_block(self.generator, n)
+        [mod.next_block(n) for mod in self._iterated]
+        for modifier in self.modifiers:
+            val = modify_block(modifier, val)
+        return val
+
 
 class WaveAdder:
     """
@@ -78,6 +140,8 @@ class WaveAdder:
     For parallel composition of waves.
     """
 
+    __slots__ = ("generators", "stereo", "channels", "_enders", "_ended")
+
     def __init__(self, *generators, stereo=False):
         """
         generator : instance of an Oscillator or
@@ -90,6 +154,9 @@ class WaveAdder:
         """
         self.generators = generators
         self.stereo = stereo
+        self.channels = 2 if stereo else 1
+        self._enders = [gen for gen in generators if hasattr(gen, "ended")]
+        self._ended = False
 
     def _mod_channels(self, _val):
         val = _val
@@ -99,6 +166,17 @@ class WaveAdder:
             val = sum(_val) / len(_val)
         return val
 
+    def _mod_channels_block(self, val):
+        # Mono blocks are broadcast to both channels without a copy.
+        if val.ndim == 1 and self.stereo:
+            val = val[:, None]
+        elif val.ndim == 2 and not self.stereo:
+            val = val.mean(axis=1)
+        return val
+
+    def retune(self, ratio, tuning=None):
+        [gen.retune(ratio, tuning) for gen in self.generators if hasattr(gen, "retune")]
+
     def trigger_release(self):
         [
             gen.trigger_release()
@@ -108,11 +186,21 @@ class WaveAdder:
 
     @property
     def ended(self):
-        ended = [gen.ended for gen in self.generators if hasattr(gen, "ended")]
-        return all(ended)
+        if not self._ended:
+            self._ended = all(gen.ended for gen in self._enders)
+        return self._ended
+
+    def get_state(self):
+        return WaveAdderState([get_state(gen) for gen in self.generators], self._ended)
+
+    def set_state(self, state):
+        for gen, gen_state in zip(self.generators, state.generators):
+            set_state(gen, gen_state)
+        self._ended = state.ended
 
     def __iter__(self):
         [iter(gen) for gen in self.generators]
+        self._ended = False
         return self
 
     def __next__(self):
@@ -123,3 +211,14 @@ class WaveAdder:
         else:
             val = sum(vals) / len(vals)
         return val
+
+    def next_block(self, n):
+        """
+        Returns the next `n` values as an array of shape (n, 2)
+        if stereo else (n,).
+        """
+        acc = np.zeros((n, 2) if self.stereo else n, dtype=DTYPE)
+        for gen in self.generators:
+            acc += self._mod_channels_block(render_block(gen, n))
+        acc *= 1 / len(self.generators)
+        return acc
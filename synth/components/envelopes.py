@@ -1,4 +1,10 @@
-import itertools
+import math
+import numpy as np
+from .blocks import DTYPE
+from .state import EnvelopeState
+
+# Stages of the ADSREnvelope
+ATTACK, DECAY, SUSTAIN, RELEASE, ENDED = range(5)
 
 
 class ADSREnvelope:
@@ -7,8 +13,29 @@ class ADSREnvelope:
 
     Has `.trigger_release()` implemented to trigger the release stage of the envelope.
     similarly has `.ended`, a flag to indicate the end of the release stage.
+
+    Each stage is computed in closed form from the index of the sample within
+    the stage, so a block of values is generated with a few array operations
+    and stage boundaries that fall inside a block are placed exactly.
     """
 
+    channels = 1
+
+    __slots__ = (
+        "attack_duration",
+        "decay_duration",
+        "sustain_level",
+        "release_duration",
+        "_sample_rate",
+        "curve",
+        "ended",
+        "val",
+        "_lengths",
+        "_stage",
+        "_k",
+        "_release_from",
+    )
+
     def __init__(
         self,
         attack_duration=0.05,
@@ -16,6 +43,7 @@ class ADSREnvelope:
         sustain_level=0.7,
         release_duration=0.3,
         sample_rate=44_100,
+        curve=0,
     ):
         """
         attack_duration : time taken to reach from 0 to 1 in s.
@@ -24,67 +52,122 @@ class ADSREnvelope:
             be in the range [0,1]
         release_duration : time taken to reach 0 from current value in s.
         sample_rate : the sample rate at which the notes are to be consumed.
+        curve : 0 for linear stages, a positive value gives exponential
+            stages that move fast at first and slow down towards their
+            target, larger values being steeper.
         """
         self.attack_duration = attack_duration
         self.decay_duration = decay_duration
         self.sustain_level = sustain_level
         self.release_duration = release_duration
         self._sample_rate = sample_rate
+        self.curve = curve
+        self.ended = False
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, value):
+        # Applied on the next __iter__.
+        self._sample_rate = value
+
+    def _shape(self, x):
+        # Maps the position x in [0, 1] within a stage to the
+        # fraction of the stage's change that has happened.
+        if self.curve == 0:
+            return x
+        return (1 - np.exp(-self.curve * x)) / (1 - math.exp(-self.curve))
+
+    def _value(self, k):
+        # Value of the current stage at the index (or indices) k.
+        stage = self._stage
+        if stage == ATTACK:
+            return self._shape(k / self._lengths[ATTACK])
+        elif stage == DECAY:
+            d = self._shape(k / self._lengths[DECAY])
+            return 1 - (1 - self.sustain_level) * d
+        elif stage == SUSTAIN:
+            return self.sustain_level
+        elif stage == RELEASE:
+            return self._release_from * (1 - self._shape(k / self._lengths[RELEASE]))
+        return 0
 
-    def _get_ads_stepper(self):
-        steppers = []
-        if self.attack_duration > 0:
-            steppers.append(
-                itertools.count(
-                    start=0, step=1 / (self.attack_duration * self._sample_rate)
-                )
-            )
-        if self.decay_duration > 0:
-            steppers.append(
-                itertools.count(
-                    start=1,
-                    step=-(1 - self.sustain_level)
-                    / (self.decay_duration * self._sample_rate),
-                )
-            )
-        while True:
-            l = len(steppers)
-            if l > 0:
-                val = next(steppers[0])
-                if l == 2 and val > 1:
-                    steppers.pop(0)
-                    val = next(steppers[0])
-                elif l == 1 and val < self.sustain_level:
-                    steppers.pop(0)
-                    val = self.sustain_level
-            else:
-                val = self.sustain_level
-            yield val
-
-    def _get_r_stepper(self):
-        val = 1
-        if self.release_duration > 0:
-            release_step = -self.val / (self.release_duration * self._sample_rate)
-            stepper = itertools.count(self.val, step=release_step)
-        else:
-            val = -1
-        while True:
-            if val <= 0:
-                self.ended = True
-                val = 0
-            else:
-                val = next(stepper)
-            yield val
+    def _advance(self):
+        # Moves past the stages that are over, stages of zero length
+        # are skipped, SUSTAIN and ENDED never end.
+        while self._k >= self._lengths[self._stage]:
+            self._stage = SUSTAIN if self._stage == DECAY else self._stage + 1
+            self._k = 0
+        if self._stage == ENDED:
+            self.ended = True
+
+    def _get_lengths(self):
+        # Lengths of the stages in samples.
+        sr = self._sample_rate
+        return [
+            round(self.attack_duration * sr),
+            round(self.decay_duration * sr),
+            math.inf,
+            round(self.release_duration * sr),
+            math.inf,
+        ]
+
+    def get_state(self):
+        """
+        Returns the state of the envelope, for `.set_state`
+        to continue from where it is.
+        """
+        return EnvelopeState(
+            self._stage,
+            self._k,
+            float(self.val),
+            getattr(self, "_release_from", 0),
+            self.ended,
+        )
+
+    def set_state(self, state):
+        """
+        Restores a state returned by `.get_state`.
+        """
+        self._lengths = self._get_lengths()
+        self._stage = state.stage
+        self._k = state.k
+        self.val = state.val
+        self._release_from = state.release_from
+        self.ended = state.ended
 
     def __iter__(self):
+        self._lengths = self._get_lengths()
         self.val = 0
         self.ended = False
-        self.stepper = self._get_ads_stepper()
+        self._stage = ATTACK
+        self._k = 0
+        self._advance()
         return self
 
     def __next__(self):
-        self.val = next(self.stepper)
+        self.val = self._value(self._k)
+        self._k += 1
+        self._advance()
         return self.val
 
+    def next_block(self, n):
+        out = np.empty(n, dtype=DTYPE)
+        i = 0
+        while i < n:
+            m = int(min(n - i, self._lengths[self._stage] - self._k))
+            out[i : i + m] = self._value(self._k + np.arange(m))
+            self._k += m
+            i += m
+            self._advance()
+        if n > 0:
+            self.val = float(out[-1])
+        return out
+
     def trigger_release(self):
-        self.stepper = self._get_r_stepper()
+        self._release_from = self.val
+        self._stage = RELEASE
+        self._k = 0
+        self._advance()
@@ -5,7 +5,18 @@ of any kind of generator. Generally used in a Chain
 component.
 """
 
+import numpy as np
 from collections.abc import Iterable
+from .blocks import DTYPE, get_state, render_block, set_state
+from .control import with_control_rate
+from .state import ModulatorState, ValueState
+
+
+def _last(value):
+    # Last value of a parameter that was set a block at a time.
+    if isinstance(value, np.ndarray):
+        return float(value[-1]) if len(value) else 0.0
+    return value
 
 
 class Panner:
@@ -13,6 +24,8 @@ class Panner:
     Will convert a mono input into stereo.
     """
 
+    __slots__ = ("r",)
+
     def __init__(self, r=0.5):
         """
         r : is the right pan value, 0 means 100% left
@@ -21,9 +34,23 @@ class Panner:
         """
         self.r = r
 
+    def out_channels(self, channels):
+        return 2
+
+    def get_state(self):
+        return ValueState(_last(self.r))
+
+    def set_state(self, state):
+        self.r = state.value
+
     def __call__(self, val):
         r = self.r * 2
         l = 2 - r
+        if isinstance(val, np.ndarray):
+            out = np.empty((len(val), 2), dtype=DTYPE)
+            np.multiply(val, l, out=out[:, 0])
+            np.multiply(val, r, out=out[:, 1])
+            return out
         return (l * val, r * val)
 
 
@@ -33,14 +60,25 @@ class ModulatedPanner(Panner):
     to set the internal `r` value.
     """
 
-    def __init__(self, modulator):
+    __slots__ = ("modulator",)
+
+    def __init__(self, modulator, control_rate=None):
         """
         modulator : any kind of generator that returns a
             value within the range of [-1, 1] this is used
             to set the `r` value that has a range of [0, 1]
+        control_rate : if above 1 the modulator is evaluated once
+            every `control_rate` samples, see `ControlRate`.
         """
         super().__init__(r=0)
-        self.modulator = modulator
+        self.modulator = with_control_rate(modulator, control_rate)
+
+    def get_state(self):
+        return ModulatorState(get_state(self.modulator), _last(self.r))
+
+    def set_state(self, state):
+        set_state(self.modulator, state.modulator)
+        self.r = state.value
 
     def __iter__(self):
         iter(self.modulator)
@@ -50,6 +88,10 @@ class ModulatedPanner(Panner):
         self.r = (next(self.modulator) + 1) / 2
         return self.r
 
+    def next_block(self, n):
+        self.r = (render_block(self.modulator, n) + 1) / 2
+        return self.r
+
 
 class Volume:
     """
@@ -57,6 +99,8 @@ class Volume:
     to increase or decrease the amplitude.
     """
 
+    __slots__ = ("amp",)
+
     def __init__(self, amp=1.0):
         """
         amp : sets the amplitude multiplier for the
@@ -64,12 +108,26 @@ class Volume:
         """
         self.amp = amp
 
+    def out_channels(self, channels):
+        return channels
+
+    def get_state(self):
+        return ValueState(_last(self.amp))
+
+    def set_state(self, state):
+        self.amp = state.value
+
     def __call__(self, val):
         _val = None
-        if isinstance(val, Iterable):
-            _val = tuple(v * self.amp for v in val)
-        elif isinstance(val, (int, float)):
+        if isinstance(val, (int, float)):
             _val = val * self.amp
+        elif isinstance(val, np.ndarray):
+            amp = self.amp
+            if isinstance(amp, np.ndarray) and val.ndim == 2:
+                amp = amp[:, None]
+            _val = np.multiply(val, amp, dtype=DTYPE)
+        elif isinstance(val, Iterable):
+            _val = tuple(v * self.amp for v in val)
         return _val
 
 
@@ -79,15 +137,26 @@ class ModulatedVolume(Volume):
     internal `amp` is set by a modulator.
     """
 
-    def __init__(self, modulator):
+    __slots__ = ("modulator",)
+
+    def __init__(self, modulator, control_rate=None):
         """
         modulator : any kind of generator that returns a
             value within the range of [0, max_amp] this is used
             to set the `amp` value directly. If max_amp is > 1
             then the amplitude of the input will increase.
+        control_rate : if above 1 the modulator is evaluated once
+            every `control_rate` samples, see `ControlRate`.
         """
         super().__init__(0.0)
-        self.modulator = modulator
+        self.modulator = with_control_rate(modulator, control_rate)
+
+    def get_state(self):
+        return ModulatorState(get_state(self.modulator), _last(self.amp))
+
+    def set_state(self, state):
+        set_state(self.modulator, state.modulator)
+        self.amp = state.value
 
     def __iter__(self):
         iter(self.modulator)
@@ -97,6 +166,10 @@ class ModulatedVolume(Volume):
         self.amp = next(self.modulator)
         return self.amp
 
+    def next_block(self, n):
+        self.amp = render_block(self.modulator, n)
+        return self.amp
+
     def trigger_release(self):
         if hasattr(self.modulator, "trigger_release"):
             self.modulator.trigger_release()
@@ -115,16 +188,28 @@ class Clipper:
     the given wave range.
     """
 
+    __slots__ = ("wave_range", "mm")
+
     def __init__(self, wave_range=(-1, 1)):
         """
         wave_range : tuple of (min, max) values which are
             used to clip the input signal.
         """
         mi, ma = wave_range
+        self.wave_range = wave_range
         self.mm = lambda v: max(mi, min(ma, v))
 
+    def out_channels(self, channels):
+        return channels
+
     def __call__(self, val):
-        if isinstance(val, Iterable):
+        if isinstance(val, np.ndarray):
+            mi, ma = self.wave_range
+            if val.ndim == 2:
+                _val = np.clip(val / 2, mi, ma) * 2
+            else:
+                _val = np.clip(val, mi, ma)
+        elif isinstance(val, Iterable):
             _val = tuple(self.mm(v / 2) * 2 for v in val)
         else:
             _val = self.mm(val)
@@ -3,3 +3,4 @@ from .oscillators import SquareOscillator
 from .oscillators import SawtoothOscillator
 from .oscillators import TriangleOscillator
 from .modulated_oscillator import ModulatedOscillator
+from .wavetable_oscillator import WavetableOscillator
@@ -1,7 +1,33 @@
+import numpy as np
 from abc import ABC, abstractmethod
+from ..blocks import DTYPE
+from ..state import OscillatorState
 
 
 class Oscillator(ABC):
+    channels = 1
+
+    # Table of a Tuning the step of the oscillator is looked up in,
+    # "step" or "period", None if the step is always computed.
+    STEP = None
+
+    # The oscillators keep their state in slots, a voice being built
+    # from several of them. Subclasses declare the slots they add.
+    __slots__ = (
+        "_freq",
+        "_amp",
+        "_phase",
+        "_sample_rate",
+        "_wave_range",
+        "_squish",
+        "_base_freq",
+        "_tuned",
+        "_f",
+        "_a",
+        "_p",
+        "_i",
+    )
+
     def __init__(
         self, freq=440, phase=0, amp=1, sample_rate=44_100, wave_range=(-1, 1)
     ):
@@ -10,6 +36,11 @@ class Oscillator(ABC):
         self._phase = phase
         self._sample_rate = sample_rate
         self._wave_range = wave_range
+        # Whether the values are mapped from [-1, 1] to the wave range.
+        self._squish = tuple(wave_range) != (-1, 1)
+        self._base_freq = freq
+        # Step of `_freq` looked up in a tuning, None if it is computed.
+        self._tuned = None
 
         # Properties that will be changed
         self._f = freq
@@ -55,9 +86,66 @@ class Oscillator(ABC):
         self._p = value
         self._post_phase_set()
 
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, value):
+        self._sample_rate = value
+        self._tuned = None
+        self._post_freq_set()
+
+    def retune(self, ratio, tuning=None):
+        """
+        Sets the frequency to `ratio` times the frequency
+        the oscillator was created with.
+
+        tuning : instance of Tuning, if the new frequency is a note of
+            the tuning its step is taken from the tables of the tuning
+            instead of being computed.
+        """
+        self._freq = self._base_freq * ratio
+        self._tuned = None
+        if tuning is not None and self.STEP is not None:
+            self._tuned = tuning.lookup(self.STEP, self._freq, self._sample_rate)
+        self._set_freq()
+
+    def _set_freq(self):
+        # Sets the frequency to the initial one along with its step.
+        self._f = self._freq
+        if self._tuned is None:
+            self._post_freq_set()
+        else:
+            self._set_step(self._tuned)
+
+    def get_state(self):
+        """
+        Returns the state of the oscillator, for `.set_state`
+        to continue from where it is.
+        """
+        return OscillatorState(self._i, self._freq, self._f, self._a, self._p)
+
+    def set_state(self, state):
+        """
+        Restores a state returned by `.get_state`.
+        """
+        self._i = state.i
+        self._freq = state.base
+        self._tuned = None
+        self._f = state.freq
+        self._a = state.amp
+        self._post_freq_set()
+        # The phase is kept in the units of the oscillator.
+        self._p = state.phase
+
     def _post_freq_set(self):
         pass
 
+    def _set_step(self, step):
+        # Sets the step of the current frequency from the table `STEP`.
+        pass
+
     def _post_amp_set(self):
         pass
 
@@ -76,8 +164,55 @@ class Oscillator(ABC):
     def __next__(self):
         return None
 
+    def next_block(self, n):
+        """
+        Returns the next `n` samples as a numpy array, continuing
+        from the current state just as `n` calls to __next__ would.
+
+        Subclasses override this with a vectorized version, the
+        default falls back to the per sample path.
+        """
+        return np.fromiter((next(self) for _ in range(n)), dtype=DTYPE, count=n)
+
+    def modulated_block(self, n, freq=None, amp=None, phase=None):
+        """
+        Returns the next `n` samples as a numpy array with the frequency,
+        amplitude and phase set per sample from the arrays `freq`, `amp`
+        and `phase` of shape (n,), parameters that are None are left as
+        they are. Afterwards the parameters hold their last values.
+
+        Subclasses override this with a vectorized version, the
+        default falls back to the per sample path.
+        """
+        out = np.empty(n, dtype=DTYPE)
+        for k in range(n):
+            if amp is not None:
+                self.amp = amp[k]
+            if freq is not None:
+                self.freq = freq[k]
+            if phase is not None:
+                self.phase = phase[k]
+            out[k] = next(self)
+        return out
+
+    def _set_last(self, freq, amp, phase):
+        # Leaves the parameters at the last of the per sample values.
+        if amp is not None:
+            self.amp = amp[-1]
+        if freq is not None:
+            self.freq = freq[-1]
+        if phase is not None:
+            self.phase = phase[-1]
+
+    @staticmethod
+    def _offsets(increments):
+        # Exclusive cumulative sum, the sum of the increments before
+        # each sample, and the total of all the increments.
+        cum = np.cumsum(increments)
+        return cum - increments, cum[-1]
+
     def __iter__(self):
-        self.freq = self._freq
+        self._set_freq()
         self.phase = self._phase
         self.amp = self._amp
         self._initialize_osc()
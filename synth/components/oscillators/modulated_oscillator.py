@@ -1,3 +1,9 @@
+import numpy as np
+from ..blocks import DTYPE, get_state, render_block, set_state
+from ..control import is_reclockable, with_control_rate
+from ..state import ModulatedOscillatorState
+
+
 class ModulatedOscillator:
     """
     Creates a modulated oscillator by using a plain oscillator along with modulators,
@@ -12,8 +18,25 @@ class ModulatedOscillator:
     to generate the sequence of values.
     """
 
+    channels = 1
+
+    __slots__ = (
+        "oscillator",
+        "modulators",
+        "amp_mod",
+        "freq_mod",
+        "phase_mod",
+        "_modulators_count",
+    )
+
     def __init__(
-        self, oscillator, *modulators, amp_mod=None, freq_mod=None, phase_mod=None
+        self,
+        oscillator,
+        *modulators,
+        amp_mod=None,
+        freq_mod=None,
+        phase_mod=None,
+        control_rate=None,
     ):
         """
         oscillator : Instance of `Oscillator`, a component that generates a
@@ -36,9 +59,13 @@ class ModulatedOscillator:
         phase_mod : Any function that takes in the initial oscillator phase
             value and the modulator value and returns the modified value.
             If set the third modualtor of the last modulator is used for the values.
+
+        control_rate : if above 1 the modulators are evaluated once every
+            `control_rate` samples and interpolated in between, see
+            `ControlRate`. Defaults to DEFAULT_CONTROL_RATE.
         """
         self.oscillator = oscillator
-        self.modulators = modulators
+        self.modulators = tuple(with_control_rate(m, control_rate) for m in modulators)
         self.amp_mod = amp_mod
         self.freq_mod = freq_mod
         self.phase_mod = phase_mod
@@ -49,6 +76,16 @@ class ModulatedOscillator:
         [iter(modulator) for modulator in self.modulators]
         return self
 
+    def get_state(self):
+        return ModulatedOscillatorState(
+            get_state(self.oscillator), [get_state(mod) for mod in self.modulators]
+        )
+
+    def set_state(self, state):
+        set_state(self.oscillator, state.oscillator)
+        for mod, mod_state in zip(self.modulators, state.modulators):
+            set_state(mod, mod_state)
+
     def _modulate(self, mod_vals):
         if self.amp_mod is not None:
             new_amp = self.amp_mod(self.oscillator.init_amp, mod_vals[0])
@@ -70,6 +107,54 @@ class ModulatedOscillator:
             new_phase = self.phase_mod(self.oscillator.init_phase, mod_val)
             self.oscillator.phase = new_phase
 
+    def _mod_index(self, param):
+        # Index of the modulator used for `param` ("amp", "freq" or
+        # "phase"), resolved the same way as in `_modulate`.
+        count = self._modulators_count
+        if param == "amp":
+            return 0
+        elif param == "freq":
+            return 1 if count == 2 else 0
+        return 2 if count == 3 else count - 1
+
+    @staticmethod
+    def _apply_mod(mod_fn, init_val, mod_vals, n):
+        # Applies a modulation function to a whole block of modulator
+        # values, functions that only work on scalars (e.g. ones that
+        # use `math`) are vectorized.
+        try:
+            vals = mod_fn(init_val, mod_vals)
+        except (TypeError, ValueError):
+            vals = np.vectorize(mod_fn, otypes=[float])(init_val, mod_vals)
+        return np.broadcast_to(np.asarray(vals, dtype=float), (n,))
+
+    def _get_mod_params(self, mod_vals, n):
+        # Returns the per sample values of the modulated parameters.
+        params = {}
+        for name in ("amp", "freq", "phase"):
+            mod_fn = getattr(self, f"{name}_mod")
+            if mod_fn is not None:
+                init_val = getattr(self.oscillator, f"init_{name}")
+                vals = mod_vals[self._mod_index(name)]
+                params[name] = self._apply_mod(mod_fn, init_val, vals, n)
+        return params
+
+    @property
+    def sample_rate(self):
+        return self.oscillator.sample_rate
+
+    @sample_rate.setter
+    def sample_rate(self, value):
+        ratio = value / self.oscillator.sample_rate
+        self.oscillator.sample_rate = value
+        for modulator in self.modulators:
+            if is_reclockable(modulator):
+                modulator.sample_rate = modulator.sample_rate * ratio
+
+    def retune(self, ratio, tuning=None):
+        if hasattr(self.oscillator, "retune"):
+            self.oscillator.retune(ratio, tuning)
+
     def trigger_release(self):
         tr = "trigger_release"
         for modulator in self.modulators:
@@ -93,3 +178,17 @@ class ModulatedOscillator:
         mod_vals = [next(modulator) for modulator in self.modulators]
         self._modulate(mod_vals)
         return next(self.oscillator)
+
+    def next_block(self, n):
+        """
+        Returns the next `n` values as an array. The modulators are
+        rendered a block at a time and the modulation functions are
+        called once with arrays of the modulator values, they may also
+        return scalars. The oscillator renders the block from the per
+        sample parameters with `modulated_block`.
+        """
+        if not hasattr(self.oscillator, "modulated_block"):
+            return np.array([next(self) for _ in range(n)], dtype=DTYPE)
+        mod_vals = [render_block(modulator, n) for modulator in self.modulators]
+        params = self._get_mod_params(mod_vals, n)
+        return self.oscillator.modulated_block(n, **params)
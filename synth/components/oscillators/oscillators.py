@@ -1,26 +1,70 @@
 import math
+import numpy as np
+from ..blocks import DTYPE
 from .base_oscillator import Oscillator
 
 
 class SineOscillator(Oscillator):
+    STEP = "step"
+
+    __slots__ = ("_step",)
+
     def _post_freq_set(self):
         self._step = (2 * math.pi * self._f) / self._sample_rate
 
+    def _set_step(self, step):
+        self._step = step
+
     def _post_phase_set(self):
         self._p = (self._p / 360) * 2 * math.pi
 
     def _initialize_osc(self):
         self._i = 0
 
+    def _wave(self, x):
+        # Vectorized wave shape for the phase values `x`.
+        val = np.sin(x)
+        if self._squish:
+            val = self.squish_val(val, *self._wave_range)
+        return val
+
+    def next_block(self, n):
+        x = self._i + self._p + self._step * np.arange(n)
+        self._i = self._i + self._step * n
+        return np.multiply(self._wave(x), self._a, dtype=DTYPE)
+
+    def modulated_block(self, n, freq=None, amp=None, phase=None):
+        # The phase is the cumulative sum of the per sample steps,
+        # same as advancing `_i` by the step of each sample.
+        if n == 0:
+            return np.empty(0, dtype=DTYPE)
+        if freq is None:
+            x = self._i + self._step * np.arange(n)
+            i = self._i + self._step * n
+        else:
+            offsets, total = self._offsets((2 * math.pi / self._sample_rate) * freq)
+            x = self._i + offsets
+            i = self._i + total
+        if phase is None:
+            x = x + self._p
+        else:
+            x = x + (phase / 360) * 2 * math.pi
+        val = np.multiply(self._wave(x), self._a if amp is None else amp, dtype=DTYPE)
+        self._set_last(freq, amp, phase)
+        self._i = i
+        return val
+
     def __next__(self):
         val = math.sin(self._i + self._p)
         self._i = self._i + self._step
-        if self._wave_range is not (-1, 1):
+        if self._squish:
             val = self.squish_val(val, *self._wave_range)
         return val * self._a
 
 
 class SquareOscillator(SineOscillator):
+    __slots__ = ("threshold",)
+
     def __init__(
         self,
         freq=440,
@@ -33,6 +77,11 @@ class SquareOscillator(SineOscillator):
         super().__init__(freq, phase, amp, sample_rate, wave_range)
         self.threshold = threshold
 
+    def _wave(self, x):
+        return np.where(
+            np.sin(x) < self.threshold, self._wave_range[0], self._wave_range[1]
+        )
+
     def __next__(self):
         val = math.sin(self._i + self._p)
         self._i = self._i + self._step
@@ -44,31 +93,92 @@ class SquareOscillator(SineOscillator):
 
 
 class SawtoothOscillator(Oscillator):
+    STEP = "period"
+
+    __slots__ = ("_period",)
+
     def _post_freq_set(self):
         self._period = self._sample_rate / self._f
         self._post_phase_set
 
+    def _set_step(self, step):
+        self._period = step
+
+    def retune(self, ratio, tuning=None):
+        # The sample count and the phase are in samples of the period,
+        # they are scaled to the new period so that the wave carries on
+        # from the same point of its cycle.
+        period = getattr(self, "_period", None)
+        super().retune(ratio, tuning)
+        if period is not None and hasattr(self, "_i"):
+            scale = self._period / period
+            self._i *= scale
+            self._p *= scale
+
     def _post_phase_set(self):
         self._p = ((self._p + 90) / 360) * self._period
 
     def _initialize_osc(self):
         self._i = 0
 
+    def _wave(self, div):
+        # Vectorized wave shape for the cycle positions `div`.
+        val = 2 * (div - np.floor(0.5 + div))
+        if self._squish:
+            val = self.squish_val(val, *self._wave_range)
+        return val
+
+    def next_block(self, n):
+        div = (self._i + self._p + np.arange(n)) / self._period
+        self._i = self._i + n
+        return np.multiply(self._wave(div), self._a, dtype=DTYPE)
+
+    def modulated_block(self, n, freq=None, amp=None, phase=None):
+        # Unlike __next__, which divides the sample count by the current
+        # period, the position in cycles is the cumulative sum of the per
+        # sample frequencies, so frequency modulation is phase continuous.
+        # Both are the same when the frequency is constant.
+        if n == 0:
+            return np.empty(0, dtype=DTYPE)
+        pos = self._i / self._period
+        if freq is None:
+            offsets = np.arange(n) / self._period
+            total = n / self._period
+        else:
+            offsets, total = self._offsets(freq / self._sample_rate)
+        if phase is None:
+            div = pos + offsets + self._p / self._period
+        else:
+            div = pos + offsets + (phase + 90) / 360
+        val = np.multiply(self._wave(div), self._a if amp is None else amp, dtype=DTYPE)
+        self._set_last(freq, amp, phase)
+        self._i = (pos + total) * self._period
+        return val
+
     def __next__(self):
         div = (self._i + self._p) / self._period
         val = 2 * (div - math.floor(0.5 + div))
         self._i = self._i + 1
-        if self._wave_range is not (-1, 1):
+        if self._squish:
             val = self.squish_val(val, *self._wave_range)
         return val * self._a
 
 
 class TriangleOscillator(SawtoothOscillator):
+    __slots__ = ()
+
+    def _wave(self, div):
+        val = 2 * (div - np.floor(0.5 + div))
+        val = (np.abs(val) - 0.5) * 2
+        if self._squish:
+            val = self.squish_val(val, *self._wave_range)
+        return val
+
     def __next__(self):
         div = (self._i + self._p) / self._period
         val = 2 * (div - math.floor(0.5 + div))
         val = (abs(val) - 0.5) * 2
         self._i = self._i + 1
-        if self._wave_range is not (-1, 1):
+        if self._squish:
             val = self.squish_val(val, *self._wave_range)
         return val * self._a
@@ -0,0 +1,152 @@
+import math
+import numpy as np
+from functools import lru_cache
+from ..blocks import DTYPE
+from .base_oscillator import Oscillator
+
+# Lowest frequency covered by the first level of the tables,
+# each following level covers one octave above the previous.
+MIN_FREQ = 20
+
+
+def _harmonics(waveform, count):
+    # Returns the sine and cosine coefficients of the first
+    # `count` harmonics (index 0 is DC) of a waveform.
+    h = np.arange(count + 1)
+    sin_c = np.zeros(count + 1)
+    cos_c = np.zeros(count + 1)
+    odd = h % 2 == 1
+    if waveform == "sine":
+        sin_c[1] = 1
+    elif waveform == "square":
+        sin_c[odd] = 4 / (np.pi * h[odd])
+    elif waveform == "sawtooth":
+        sin_c[1:] = (2 / np.pi) * (-1.0) ** (h[1:] + 1) / h[1:]
+    elif waveform == "triangle":
+        cos_c[odd] = -8 / (np.pi**2 * h[odd] ** 2)
+    else:
+        raise ValueError(f"unknown waveform '{waveform}'")
+    return sin_c, cos_c
+
+
+@lru_cache(maxsize=32)
+def get_wavetable(waveform, size=2048, sample_rate=44_100):
+    """
+    Returns the band limited tables of `waveform` as a read only array of
+    shape (levels, size + 2). The tables are cached so that all the
+    oscillators with the same waveform, size and sample rate share them.
+
+    There is one level per octave starting at MIN_FREQ, level k only has
+    the harmonics that stay below the Nyquist frequency for notes up to
+    MIN_FREQ * 2 ** (k + 1). Each table is normalized to a peak of 1 and
+    has its first two samples repeated at the end for interpolation.
+    """
+    nyquist = sample_rate / 2
+    levels = max(1, math.ceil(math.log2(nyquist / MIN_FREQ)))
+    tables = np.empty((levels, size + 2))
+    for k in range(levels):
+        count = int(nyquist / (MIN_FREQ * 2 ** (k + 1)))
+        count = max(1, min(count, size // 2 - 1))
+        sin_c, cos_c = _harmonics(waveform, count)
+        spectrum = np.zeros(size // 2 + 1, dtype=complex)
+        spectrum[: count + 1] = (cos_c - 1j * sin_c) * size / 2
+        table = np.fft.irfft(spectrum, n=size)
+        table /= np.abs(table).max()
+        if waveform in ("sawtooth", "triangle"):
+            # Same 90° offset as the SawtoothOscillator.
+            table = np.roll(table, -(size // 4))
+        tables[k, :size] = table
+        tables[k, size:] = table[:2]
+    tables.setflags(write=False)
+    return tables
+
+
+class WavetableOscillator(Oscillator):
+    """
+    Oscillator that reads a band limited waveform from a precomputed
+    table using linear interpolation, the table for the octave of the
+    current frequency is used so that the output does not alias.
+    """
+
+    __slots__ = ("waveform", "size", "_tables", "_step", "_table")
+
+    def __init__(
+        self,
+        freq=440,
+        phase=0,
+        amp=1,
+        sample_rate=44_100,
+        wave_range=(-1, 1),
+        waveform="sine",
+        size=2048,
+    ):
+        """
+        waveform : one of "sine", "square", "sawtooth" and "triangle".
+        size : number of samples in a single cycle of the table.
+        """
+        super().__init__(freq, phase, amp, sample_rate, wave_range)
+        self.waveform = waveform
+        self.size = size
+        self._tables = get_wavetable(waveform, size, sample_rate)
+
+    @Oscillator.sample_rate.setter
+    def sample_rate(self, value):
+        self._tables = get_wavetable(self.waveform, self.size, value)
+        Oscillator.sample_rate.fset(self, value)
+
+    def _get_table(self, freq):
+        # Table of the octave of `freq`.
+        level = int(math.log2(max(abs(freq), MIN_FREQ) / MIN_FREQ))
+        return self._tables[min(level, len(self._tables) - 1)]
+
+    def _post_freq_set(self):
+        self._step = self.size * self._f / self._sample_rate
+        self._table = self._get_table(self._f)
+
+    def _post_phase_set(self):
+        self._p = (self._p / 360) * self.size
+
+    def _initialize_osc(self):
+        self._i = 0
+
+    def _wave(self, idx):
+        # Vectorized interpolated lookup of the table indices `idx`.
+        t = self._table
+        i0 = idx.astype(np.intp)
+        val = t[i0] + (idx - i0) * (t[i0 + 1] - t[i0])
+        if self._squish:
+            val = self.squish_val(val, *self._wave_range)
+        return val
+
+    def next_block(self, n):
+        idx = (self._i + self._p + self._step * np.arange(n)) % self.size
+        self._i = (self._i + self._step * n) % self.size
+        return np.multiply(self._wave(idx), self._a, dtype=DTYPE)
+
+    def modulated_block(self, n, freq=None, amp=None, phase=None):
+        # The table of the highest frequency in the block is used
+        # so that none of the samples alias.
+        if n == 0:
+            return np.empty(0, dtype=DTYPE)
+        if freq is None:
+            offsets = self._step * np.arange(n)
+            total = self._step * n
+        else:
+            offsets, total = self._offsets(self.size * freq / self._sample_rate)
+            self._table = self._get_table(np.abs(freq).max())
+        p = self._p if phase is None else (phase / 360) * self.size
+        idx = (self._i + offsets + p) % self.size
+        val = np.multiply(self._wave(idx), self._a if amp is None else amp, dtype=DTYPE)
+        self._set_last(freq, amp, phase)
+        self._i = (self._i + total) % self.size
+        return val
+
+    def __next__(self):
+        idx = (self._i + self._p) % self.size
+        i0 = int(idx)
+        t = self._table
+        val = t[i0] + (idx - i0) * (t[i0 + 1] - t[i0])
+        self._i = (self._i + self._step) % self.size
+        if self._squish:
+            val = self.squish_val(val, *self._wave_range)
+        return float(val) * self._a
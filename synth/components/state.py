@@ -0,0 +1,107 @@
+"""
+Snapshots of the state of the components, returned by their `get_state`
+and restored into a component of the same structure by `set_state`.
+
+A state only holds the values that change as a component is played, such
+as the phase index of an oscillator or the stage of an envelope, and the
+states of the components within it, not the parameters the component was
+built with. States are small, can be pickled, and are restored into a
+component that has been iterated, so that a voice can be forked, a render
+checkpointed, or a state shipped to a worker process.
+"""
+
+
+class State:
+    """
+    Base of the states, the values are set in the order of `__slots__`.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values, strict=True):
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({values})"
+
+
+class ValueState(State):
+    """
+    State of a component with a single value, such as the `amp` of a
+    Volume or the `r` of a Panner.
+    """
+
+    __slots__ = ("value",)
+
+
+class OscillatorState(State):
+    """
+    State of an Oscillator, `i` is the phase index, `base` the frequency
+    the oscillator was retuned to and `phase` is in the units of the
+    oscillator.
+    """
+
+    __slots__ = ("i", "base", "freq", "amp", "phase")
+
+
+class EnvelopeState(State):
+    """
+    State of an ADSREnvelope, `k` is the index of the sample in the stage.
+    """
+
+    __slots__ = ("stage", "k", "val", "release_from", "ended")
+
+
+class ControlRateState(State):
+    """
+    State of a ControlRate, `prev` and `next` are the control values
+    interpolated between and `pos` the sample between them.
+    """
+
+    __slots__ = ("modulator", "prev", "next", "pos")
+
+
+class ModulatedOscillatorState(State):
+    __slots__ = ("oscillator", "modulators")
+
+
+class ModulatorState(State):
+    """
+    State of a modulated modifier, the state of its modulator and
+    the last value it was set to.
+    """
+
+    __slots__ = ("modulator", "value")
+
+
+class ChainState(State):
+    __slots__ = ("generator", "modifiers", "ended")
+
+
+class WaveAdderState(State):
+    __slots__ = ("generators", "ended")
+
+
+class ReaderState(State):
+    """
+    State of a BusReader, the frame of the shared source it reads next.
+    """
+
+    __slots__ = ("frame",)
+
+
+class FrozenVoiceState(State):
+    """
+    State of a FrozenVoice, `base` is the frequency of the samples it
+    plays, `pos` is the position in the held note and `rel` the position
+    in the release.
+    """
+
+    __slots__ = ("freq", "base", "amp", "pos", "released", "rel", "ended")
@@ -0,0 +1,373 @@
+import math
+from pathlib import Path
+from collections import OrderedDict
+import numpy as np
+from .components.blocks import DTYPE, render_block
+from .components.state import FrozenVoiceState
+from .mixer import block_level
+from .voices import get_nchannels
+
+
+class FrozenPatch:
+    """
+    Freezes a patch into cached samples that are played back in place of
+    the patch, for patches that always sound the same for a given note and
+    velocity. An instance is used as the `osc_function` of the patch.
+
+    A note is rendered once per frequency and velocity bucket: `hold`
+    seconds of the held note, the last `loop` seconds of which are looped
+    for as long as the note is held, followed by the release rendered after
+    `.trigger_release()` is called on the voice at the end of the hold. The
+    loop is adjusted to a whole number of periods of the note and its end
+    is crossfaded with the samples before its start so that it wraps around
+    without a click. On note off the voice crossfades into the release,
+    which is always the one of a note released at the end of the hold.
+
+    The velocities in a bucket are played from the render of the loudest
+    velocity of the bucket scaled by `amp`, which is exact for patches that
+    scale linearly with `amp`.
+
+    The renders are kept in a least recently used cache of at most
+    `max_bytes`. If `cache_dir` is set they are also saved to it and memory
+    mapped from it, so they persist across runs, the directory should only
+    be used for a single patch.
+    """
+
+    def __init__(
+        self,
+        osc_function,
+        sample_rate=44100,
+        hold=1.0,
+        loop=0.2,
+        velocity_buckets=8,
+        max_release=10,
+        silence_threshold=1e-5,
+        fade=256,
+        max_bytes=64 * 2**20,
+        cache_dir=None,
+    ):
+        """
+        osc_function : function of the signature (freq, amp, sample_rate)
+            that returns a generator for a note, the patch to freeze.
+        sample_rate : the sample rate the notes are rendered at.
+        hold : seconds of the held note that are rendered, should cover
+            the attack and the decay of the patch.
+        loop : approximate length in seconds of the looped end of the hold,
+            modulators should complete whole cycles within it.
+        velocity_buckets : number of ranges the velocities are split into.
+        max_release : the most seconds of release that are rendered.
+        silence_threshold : the release ends once a block of it peaks
+            below this level.
+        fade : length of the loop and the release crossfades in samples.
+        max_bytes : the most bytes of samples kept in the cache.
+        cache_dir : directory the renders are saved to and loaded from.
+        """
+        self.osc_function = osc_function
+        self.sample_rate = sample_rate
+        self.hold = hold
+        self.loop = loop
+        self.velocity_buckets = velocity_buckets
+        self.max_release = max_release
+        self.silence_threshold = silence_threshold
+        self.fade = fade
+        self.max_bytes = max_bytes
+        self.cache_dir = None if cache_dir is None else Path(cache_dir)
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.cache = OrderedDict()
+        self.nbytes = 0
+        self._channels = None
+
+    def __call__(self, freq=440, amp=1, sample_rate=44100):
+        if sample_rate != self.sample_rate:
+            raise ValueError(
+                f"patch is frozen at {self.sample_rate} Hz, got {sample_rate} Hz"
+            )
+        return iter(FrozenVoice(self, freq, amp))
+
+    @property
+    def channels(self):
+        if self._channels is None:
+            self._channels = get_nchannels(self.osc_function, self.sample_rate)
+        return self._channels
+
+    def _bucket(self, amp):
+        # Index of the velocity bucket and the amp it is rendered at.
+        buckets = self.velocity_buckets
+        bucket = min(max(math.ceil(amp * buckets) - 1, 0), buckets - 1)
+        return bucket, (bucket + 1) / buckets
+
+    def _loop_points(self, freq):
+        # Start and end of the loop, a whole number of periods long.
+        sr = self.sample_rate
+        end = max(int(round(self.hold * sr)), 2)
+        periods = max(round(self.loop * freq), 1)
+        length = min(max(int(round(periods * sr / freq)), 1), end // 2)
+        return end - length, end
+
+    def _fade_length(self, start, end):
+        return min(self.fade, start, end - start)
+
+    def _render(self, freq, amp):
+        # Renders the hold with a crossfaded loop and the release
+        # into a single array.
+        sr = self.sample_rate
+        start, end = self._loop_points(freq)
+        voice = iter(self.osc_function(freq=freq, amp=amp, sample_rate=sr))
+        head = np.array(render_block(voice, end), dtype=DTYPE)
+
+        f = self._fade_length(start, end)
+        if f > 0:
+            w = np.linspace(0, 1, f, endpoint=False, dtype=DTYPE)
+            if head.ndim == 2:
+                w = w[:, None]
+            loop_end = head[end - f : end]
+            loop_end += (head[start - f : start] - loop_end) * w
+
+        blocks = [head]
+        if hasattr(voice, "trigger_release"):
+            voice.trigger_release()
+            n = 1024
+            for _ in range(int(self.max_release * sr) // n):
+                # Copied as compiled voices reuse the array of their output.
+                block = np.array(render_block(voice, n), dtype=DTYPE)
+                blocks.append(block)
+                if block_level(block)[0] < self.silence_threshold or voice.ended:
+                    break
+        return np.concatenate(blocks)
+
+    def _path(self, freq, bucket):
+        name = f"{freq:.6f}_{bucket}_{self.sample_rate}.npy"
+        return self.cache_dir / name
+
+    def get(self, freq, amp):
+        """
+        Returns the frozen samples of the note and the amp they
+        were rendered at, the note is rendered if it isn't cached.
+        """
+        bucket, bucket_amp = self._bucket(amp)
+        key = (round(freq, 6), bucket)
+        cache = self.cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key], bucket_amp
+
+        if self.cache_dir is None:
+            data = self._render(freq, bucket_amp)
+        else:
+            path = self._path(freq, bucket)
+            if not path.exists():
+                np.save(path, self._render(freq, bucket_amp))
+            data = np.load(path, mmap_mode="r")
+
+        cache[key] = data
+        self.nbytes += data.nbytes
+        while self.nbytes > self.max_bytes and len(cache) > 1:
+            _, old = cache.popitem(last=False)
+            self.nbytes -= old.nbytes
+        return data, bucket_amp
+
+    def prerender(self, freqs):
+        """
+        Renders the notes of the frequencies in `freqs` for every
+        velocity bucket ahead of playback, so that no note has to
+        be rendered when it is played.
+        """
+        buckets = self.velocity_buckets
+        for freq in freqs:
+            for bucket in range(buckets):
+                self.get(freq, (bucket + 1) / buckets)
+
+
+class FrozenVoice:
+    """
+    Sample player of a note of a FrozenPatch, it is built by
+    calling the FrozenPatch and is used like the patch's voices.
+    The samples are looked up when the first block is played.
+
+    The samples are those of the frequency the voice has when it is
+    iterated. Retuning the voice afterwards, as pitch bend does, plays
+    them faster or slower by the ratio of the new frequency to that one,
+    the samples being linearly interpolated, which also shortens or
+    lengthens what is left of the envelope. As the voices are built at
+    the frequency of the note before they are bent, bent notes play the
+    cached samples of the note.
+    """
+
+    __slots__ = (
+        "patch",
+        "freq",
+        "amp",
+        "ended",
+        "_base_freq",
+        "_load_freq",
+        "_speed",
+        "_released",
+        "_rel",
+        "_pos",
+        "_data",
+        "_gain",
+        "_start",
+        "_end",
+        "_fade",
+    )
+
+    def __init__(self, patch, freq, amp):
+        self.patch = patch
+        self.freq = freq
+        self.amp = amp
+        self._base_freq = freq
+        self._load_freq = freq
+        self._speed = 1.0
+        self._released = False
+        self._data = None
+        self._pos = 0
+        self._rel = 0
+        self.ended = False
+
+    @property
+    def channels(self):
+        return self.patch.channels
+
+    def retune(self, ratio, tuning=None):
+        self.freq = self._base_freq * ratio
+        self._set_speed()
+
+    def _set_speed(self):
+        # Samples of the loaded note played per sample.
+        self._speed = self.freq / self._load_freq
+        if self._speed == 1:
+            # Back at the loaded frequency, the positions are whole
+            # samples again so that the samples are copied as they are.
+            self._pos = round(self._pos)
+            self._rel = round(self._rel)
+
+    def trigger_release(self):
+        if not self._released:
+            self._released = True
+            self._rel = 0
+
+    def get_state(self):
+        return FrozenVoiceState(
+            self.freq,
+            self._load_freq,
+            self.amp,
+            self._pos,
+            self._released,
+            self._rel,
+            self.ended,
+        )
+
+    def set_state(self, state):
+        self.freq = state.freq
+        self._load_freq = state.base
+        self.amp = state.amp
+        self._pos = state.pos
+        self._released = state.released
+        self._rel = state.rel
+        self.ended = state.ended
+        self._set_speed()
+        # The samples of the note are looked up again.
+        self._data = None
+
+    def _load(self):
+        data, bucket_amp = self.patch.get(self._load_freq, self.amp)
+        self._data = data
+        self._gain = self.amp / bucket_amp
+        self._start, self._end = self.patch._loop_points(self._load_freq)
+        self._fade = self.patch._fade_length(self._start, self._end)
+
+    def __iter__(self):
+        self._data = None
+        self._load_freq = self.freq
+        self._speed = 1.0
+        self._pos = 0
+        self._released = False
+        self._rel = 0
+        self.ended = False
+        return self
+
+    def _wrap(self, idx):
+        # Wraps the indices of the held note around the loop.
+        start, end = self._start, self._end
+        return np.where(idx < end, idx, start + (idx - start) % (end - start))
+
+    def _steps(self, n):
+        # Offsets of the next `n` samples from the current position,
+        # whole samples if the voice isn't retuned.
+        if self._speed == 1:
+            return np.arange(n)
+        return self._speed * np.arange(n)
+
+    def _interpolate(self, i, j, frac):
+        # The samples between `i` and `j` at the fractions `frac`.
+        a = self._data[i]
+        b = self._data[j]
+        frac = frac.astype(DTYPE)
+        if a.ndim == 2:
+            frac = frac[:, None]
+        return a + (b - a) * frac
+
+    def _held(self, n):
+        # The next `n` samples of the held note.
+        pos = self._pos
+        if self._speed == 1:
+            if pos + n <= self._end:
+                return self._data[pos : pos + n]
+            return self._data[self._wrap(pos + np.arange(n))]
+
+        idx = self._wrap(pos + self._steps(n))
+        i = idx.astype(np.intp)
+        return self._interpolate(i, self._wrap(i + 1), idx - i)
+
+    def _release(self, n):
+        # The next `n` samples of the release, crossfaded
+        # from the held note for `fade` samples.
+        data = self._data
+        rel = self._rel
+        i = self._end + rel
+        if self._speed == 1 and rel >= self._fade and i + n <= len(data):
+            return data[i : i + n]
+
+        offsets = rel + self._steps(n)
+        idx = self._end + offsets
+        last = len(data) - 1
+        if self._speed == 1:
+            out = data[np.minimum(idx, last)]
+        else:
+            j = np.minimum(idx.astype(np.intp), last)
+            out = self._interpolate(j, np.minimum(j + 1, last), idx - j)
+        out[idx >= len(data)] = 0
+        if rel < self._fade:
+            w = np.minimum(offsets / self._fade, 1).astype(DTYPE)
+            if out.ndim == 2:
+                w = w[:, None]
+            held = self._held(n)
+            out += (held - out) * (1 - w)
+        return out
+
+    def next_block(self, n):
+        """
+        Returns the next `n` samples as an array of shape (n,) or (n, 2).
+        """
+        if self._data is None:
+            self._load()
+        if not self._released:
+            out = self._held(n)
+        else:
+            out = self._release(n)
+            self._rel += n if self._speed == 1 else self._speed * n
+            if self._end + self._rel >= len(self._data) and self._rel >= self._fade:
+                self.ended = True
+
+        if self._speed == 1:
+            self._pos = int(self._wrap(self._pos + n))
+        else:
+            self._pos = float(self._wrap(self._pos + self._speed * n))
+        return np.multiply(out, self._gain, dtype=DTYPE)
+
+    def __next__(self):
+        # Python floats as returned by the other components.
+        val = self.next_block(1)[0].tolist()
+        return tuple(val) if isinstance(val, list) else val
@@ -0,0 +1,124 @@
+import numpy as np
+from .components.blocks import render_block
+
+
+def float_to_int16(acc, amp_scale=0.3, max_amp=0.8, out=None):
+    """
+    Scales the summed voices in the float32 array `acc` by `amp_scale`,
+    clips them to `max_amp` and converts them into int16, `acc` is
+    modified in place. The result is written into `out` if given.
+    """
+    if out is None:
+        out = np.empty(acc.shape, dtype=np.int16)
+    np.multiply(acc, amp_scale * 32767, out=acc)
+    lim = max_amp * 32767
+    np.clip(acc, -lim, lim, out=acc)
+    np.copyto(out, acc, casting="unsafe")
+    return out
+
+
+def block_level(block):
+    """
+    Returns the peak and the RMS of the values of a block.
+    """
+    peak = max(float(block.max()), -float(block.min()))
+    flat = block.reshape(-1)
+    rms = (float(np.dot(flat, flat)) / flat.size) ** 0.5
+    return peak, rms
+
+
+def silence_level(amp_scale=0.3):
+    """
+    Returns the level below which a voice changes the int16
+    output by less than half of its least significant bit.
+    """
+    return 0.5 / (32767 * amp_scale)
+
+
+class Mixer:
+    """
+    Mixes the blocks of several voices into a preallocated float32
+    accumulator and converts the result into a preallocated int16
+    buffer, so that no new arrays are allocated per buffer other
+    than the voice blocks themselves.
+
+    The int16 buffer is reused for every call to `.mix`, it is
+    meant to be handed to `stream.write` before the next call.
+    """
+
+    def __init__(self, num_samples, nchannels, amp_scale=0.3, max_amp=0.8, acc=None):
+        """
+        num_samples : number of frames in a buffer.
+        nchannels : number of output channels, mono voices are
+            copied to all the channels.
+        amp_scale : scaling applied to the sum of the voices.
+        max_amp : the absolute value the scaled sum is clipped to.
+        acc : float32 array of shape (num_samples, nchannels) used as
+            the accumulator, such as one in shared memory, if None
+            it is allocated.
+        """
+        self.num_samples = num_samples
+        self.nchannels = nchannels
+        self.amp_scale = amp_scale
+        self.max_amp = max_amp
+
+        if acc is None:
+            acc = np.zeros((num_samples, nchannels), dtype=np.float32)
+        self._acc = acc
+        self._out = np.zeros((num_samples, nchannels), dtype=np.int16)
+
+    def clear(self):
+        self._acc.fill(0)
+
+    def add(self, voices, start=0, stop=None, levels=None):
+        """
+        Renders the next `stop - start` frames of each of the voices
+        and adds them to the frames `start` to `stop` of the float32
+        accumulator, so that a buffer can be rendered in parts.
+
+        levels : if a list, the (peak, rms) of the block of each
+            voice is appended to it in the order of `voices`.
+        """
+        if stop is None:
+            stop = self.num_samples
+        acc = self._acc[start:stop]
+        for voice in voices:
+            block = render_block(voice, stop - start)
+            if levels is not None:
+                levels.append(block_level(block))
+            if block.ndim == 1:
+                block = block[:, None]
+            np.add(acc, block, out=acc)
+
+    def sum(self, blocks):
+        """
+        Sets the accumulator to the sum of the float32 blocks of shape
+        (num_samples, nchannels) stacked in the array `blocks`, such
+        as the accumulators of the mixers of other processes.
+        """
+        np.sum(blocks, axis=0, out=self._acc)
+
+    def accumulate(self, voices, levels=None):
+        """
+        Renders a block from each of the voices and sums them
+        into the float32 accumulator, which is returned.
+        `levels` is as in `.add`.
+        """
+        self.clear()
+        self.add(voices, levels=levels)
+        return self._acc
+
+    def convert(self):
+        """
+        Returns the accumulator converted into the int16 buffer.
+        """
+        return float_to_int16(self._acc, self.amp_scale, self.max_amp, out=self._out)
+
+    def mix(self, voices, levels=None):
+        """
+        Returns the mixed block of the voices as an int16 array
+        of shape (num_samples, nchannels), `levels` is as
+        in `.add`.
+        """
+        self.accumulate(voices, levels)
+        return self.convert()
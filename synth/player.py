@@ -1,16 +1,43 @@
-import pyaudio
-import numpy as np
-from pygame import midi
+import time
+from collections import deque
+from .backends import (
+    PA_CONTINUE,
+    PA_INT16,
+    PA_OUTPUT_UNDERFLOW,
+    PA_OUTPUT_UNDERFLOWED,
+    PyAudioOutput,
+    PygameMidiInput,
+)
+from .mixer import Mixer, silence_level
+from .scheduler import EventScheduler
+from .telemetry import RenderStats
+from .voices import get_nchannels, get_voices
 
 
 class PolySynth:
-    def __init__(self, amp_scale=0.3, max_amp=0.8, sample_rate=44100, num_samples=64):
-        # Initialize MIDI
-        midi.init()
-        if midi.get_count() > 0:
-            self.midi_input = midi.Input(midi.get_default_input_id())
-        else:
-            raise Exception("no midi devices detected")
+    def __init__(
+        self,
+        amp_scale=0.3,
+        max_amp=0.8,
+        sample_rate=44100,
+        num_samples=64,
+        max_voices=None,
+        steal="oldest",
+        stats_size=4096,
+        silence_threshold=None,
+        tuning=None,
+        midi_input=None,
+        audio_output=None,
+        latency=None,
+        workers=1,
+        bus=None,
+    ):
+        # MIDI input and audio output backends, see synth.backends,
+        # by default the default MIDI device and PyAudio.
+        if midi_input is None:
+            midi_input = PygameMidiInput()
+        self.midi_input = midi_input
+        self.audio_output = PyAudioOutput() if audio_output is None else audio_output
 
         # Constants
         self.num_samples = num_samples
@@ -18,71 +45,245 @@ class PolySynth:
         self.amp_scale = amp_scale
         self.max_amp = max_amp
 
-    def _init_stream(self, nchannels):
-        # Initialize the Stream object
-        self.stream = pyaudio.PyAudio().open(
+        # Voice pool, a voice is built per note if max_voices is None
+        self.max_voices = max_voices
+        self.steal = steal
+
+        # Peak level below which released voices are removed, by
+        # default the level that doesn't change the int16 output.
+        if silence_threshold is None:
+            silence_threshold = silence_level(amp_scale)
+        self.silence_threshold = silence_threshold
+
+        # Note frequencies, 12 tone equal temperament if None
+        self.tuning = tuning
+
+        # Frames from the timestamp of a MIDI event to the
+        # frame it is played at, one buffer if None
+        self.latency = latency
+
+        # Processes the voices are rendered by, see synth.workers,
+        # with 1 they are rendered by the playing thread
+        self.workers = workers
+
+        # ModulationBus read by the voices, ticked once per buffer
+        self.bus = bus
+
+        # Timings of the last `stats_size` buffers
+        self.stats = RenderStats(num_samples, sample_rate, stats_size)
+
+    def _init_stream(self, nchannels, stream_callback=None, open_stream=None):
+        # Initialize the Stream object, `open_stream` defaults to the
+        # open of the audio output. The mixer is created first as the
+        # stream callback may be called as soon as the stream is open.
+        if open_stream is None:
+            open_stream = self.audio_output.open
+        self.mixer = Mixer(self.num_samples, nchannels, self.amp_scale, self.max_amp)
+        self.stream = open_stream(
             rate=self.sample_rate,
             channels=nchannels,
-            format=pyaudio.paInt16,
+            format=PA_INT16,
             output=True,
             frames_per_buffer=self.num_samples,
+            stream_callback=stream_callback,
+        )
+
+    def _get_voices(self, osc_function, nchannels):
+        if self.workers > 1:
+            # Imported here as multiprocessing adds to the import time of synth.
+            from .workers import VoiceWorkers
+
+            return VoiceWorkers(
+                osc_function,
+                self.sample_rate,
+                self.num_samples,
+                nchannels,
+                self.workers,
+                self.max_voices,
+                self.steal,
+                self.silence_threshold,
+                self.tuning,
+                bus=self.bus,
+            )
+        return get_voices(
+            osc_function,
+            self.sample_rate,
+            self.max_voices,
+            self.steal,
+            self.silence_threshold,
+            self.tuning,
+            self.bus,
         )
 
-    def _get_samples(self, notes_dict):
-        # Return samples in int16 format
-        samples = []
-        for _ in range(self.num_samples):
-            samples.append([next(osc[0]) for _, osc in notes_dict.items()])
-        samples = np.array(samples).sum(axis=1) * self.amp_scale
-        samples = np.int16(samples.clip(-self.max_amp, self.max_amp) * 32767)
-        return samples.reshape(self.num_samples, -1)
-
-    def play(self, osc_function, close=False):
-        tempcf = osc_function(1, 1, self.sample_rate)
-        has_trigger = hasattr(tempcf, "trigger_release")
-        tempsm = self._get_samples({-1: [tempcf, False]})
-        nchannels = tempsm.shape[1]
+    def _get_scheduler(self):
+        return EventScheduler(self.sample_rate, self.num_samples, self.latency)
+
+    def _get_samples(self, voices, events=()):
+        # Return samples in int16 format, the returned buffer
+        # is reused by the mixer on the next call.
+        return voices.mix(self.mixer, events)
+
+    def _write(self, samples):
+        # Returns True if the stream reported an output underflow,
+        # other errors, such as a lost device, are raised.
+        try:
+            self.stream.write(
+                samples, num_frames=self.num_samples, exception_on_underflow=True
+            )
+        except IOError as err:
+            if err.errno != PA_OUTPUT_UNDERFLOWED:
+                raise
+            return True
+        return False
+
+    def play(self, osc_function, close=False, stats_path=None):
+        """
+        Plays the notes received from the MIDI input until interrupted,
+        all the pending MIDI events are read between buffers and are
+        applied at the frame of their timestamp.
+
+        stats_path : if set the summary of `.stats` is written
+            to it as JSON on exit.
+        """
+        nchannels = get_nchannels(osc_function, self.sample_rate)
+        voices = self._get_voices(osc_function, nchannels)
+        scheduler = self._get_scheduler()
         self._init_stream(nchannels)
+        stats = self.stats
+        stats.reset()
+        clock = time.perf_counter
 
         try:
-            notes_dict = {}
+            t_midi = 0.0
+            position = 0
             while True:
-                if notes_dict:
-                    # Play the notes
-                    samples = self._get_samples(notes_dict)
-                    self.stream.write(samples.tobytes())
+                if voices or scheduler:
+                    # Play the notes, the events that fall in the
+                    # buffer are applied at their frames
+                    t0 = clock()
+                    samples = self._get_samples(voices, scheduler.pop(position))
+                    t1 = clock()
+                    underrun = self._write(samples)
+                    t2 = clock()
+                    stats.record(
+                        t1, t1 - t0, t2 - t1, t_midi, len(voices), underrun, position
+                    )
+                    position += self.num_samples
 
-                if self.midi_input.poll():
-                    # Add or remove notes from notes_dict
-                    for event in self.midi_input.read(num_events=16):
-                        (status, note, vel, _), _ = event
-                        if status == 0x80 and note in notes_dict:
-                            if has_trigger:
-                                notes_dict[note][0].trigger_release()
-                                notes_dict[note][1] = True
-                            else:
-                                del notes_dict[note]
-
-                        elif status == 0x90:
-                            freq = midi.midi_to_frequency(note)
-                            notes_dict[note] = [
-                                osc_function(
-                                    freq=freq,
-                                    amp=vel / 127,
-                                    sample_rate=self.sample_rate,
-                                ),
-                                False,
-                            ]
-
-                if has_trigger:
-                    # Delete notes if ended
-                    ended_notes = [
-                        k for k, o in notes_dict.items() if o[0].ended and o[1]
-                    ]
-                    for note in ended_notes:
-                        del notes_dict[note]
+                # Schedule all the pending events
+                t0 = clock()
+                for frame in scheduler.drain(self.midi_input, position):
+                    stats.note_received(t0, frame)
+
+                # Delete notes if ended
+                voices.remove_ended()
+                t_midi = clock() - t0
 
         except KeyboardInterrupt as err:
             self.stream.close()
             if close:
                 self.midi_input.close()
+        finally:
+            if hasattr(voices, "close"):
+                voices.close()
+
+        if stats_path is not None:
+            stats.dump(stats_path)
+
+    def send_event(self, event):
+        """
+        Queues a MIDI event of the form [[status, note, vel, _], timestamp]
+        for the stream callback, used by `play_callback`.
+
+        The queue is bounded, if it is full the oldest event is dropped.
+        """
+        self.events.append((event, time.perf_counter()))
+
+    def _stream_callback(self, in_data, frame_count, time_info, status_flags):
+        # Runs on PyAudio's audio thread, the voices are only
+        # ever touched from here once the stream is started.
+        clock = time.perf_counter
+        t0 = clock()
+        events = self.events
+        scheduler = self.scheduler
+        position = self.position
+        pending = []
+        note_ons = []
+        while events:
+            ((status, note, vel, _), timestamp), received = events.popleft()
+            pending.append((timestamp, status, note, vel))
+            if status == 0x90:
+                note_ons.append(received)
+        for frame, received in zip(scheduler.add(pending, position), note_ons):
+            self.stats.note_received(received, frame)
+        self.voices.remove_ended()
+
+        t1 = clock()
+        samples = self._get_samples(self.voices, scheduler.pop(position, frame_count))
+        self.position = position + frame_count
+        t2 = clock()
+        underrun = bool(status_flags & PA_OUTPUT_UNDERFLOW)
+        self.stats.record(
+            t2,
+            t2 - t1,
+            midi=t1 - t0,
+            voices=len(self.voices),
+            underrun=underrun,
+            position=position,
+        )
+        return samples, PA_CONTINUE
+
+    def play_callback(
+        self,
+        osc_function,
+        close=False,
+        open_stream=None,
+        queue_size=1024,
+        poll_interval=0.001,
+        stats_path=None,
+    ):
+        """
+        Non blocking alternative to `play`, the buffers are filled by
+        PyAudio's stream callback and the MIDI events are passed to it
+        through a bounded queue, so the MIDI latency doesn't depend on
+        how long a write blocks. The polling loop sleeps for
+        `poll_interval` seconds whenever there are no MIDI events.
+
+        open_stream : callable with the signature of `PyAudio.open`
+            used to open the output stream, the `open` of the audio
+            output if None.
+        queue_size : maximum number of MIDI events that can be pending.
+        stats_path : if set the summary of `.stats` is written
+            to it as JSON on exit.
+        """
+        self.stats.reset()
+        nchannels = get_nchannels(osc_function, self.sample_rate)
+        self.voices = self._get_voices(osc_function, nchannels)
+        self.events = deque(maxlen=queue_size)
+        self.scheduler = self._get_scheduler()
+        self.position = 0
+        self._init_stream(
+            nchannels,
+            stream_callback=self._stream_callback,
+            open_stream=open_stream,
+        )
+
+        try:
+            while self.stream.is_active():
+                if self.midi_input.poll():
+                    batch = self.scheduler.batch
+                    for event in self.midi_input.read(num_events=batch):
+                        self.send_event(event)
+                else:
+                    time.sleep(poll_interval)
+
+        except KeyboardInterrupt as err:
+            pass
+
+        self.stream.close()
+        if hasattr(self.voices, "close"):
+            self.voices.close()
+        if close:
+            self.midi_input.close()
+        if stats_path is not None:
+            self.stats.dump(stats_path)
@@ -0,0 +1,271 @@
+import time
+import numpy as np
+from .components.blocks import render_block
+from .mixer import Mixer, block_level, float_to_int16, silence_level
+from .stream import write_wav
+from .voices import VoiceManager, get_nchannels, get_voices
+
+
+def _get_spans(events, frames):
+    """
+    Splits the events into note spans of the form
+    [start, note, vel, offs, cut], one per note on. `offs` are the
+    frames of the note offs received for the note while the span was
+    the latest one and `cut` is the frame at which the voice is
+    replaced by another note on of the same note.
+    """
+    spans = []
+    active = {}
+    for (_, status, note, vel), frame in zip(events, frames):
+        if status == 0x90:
+            if note in active:
+                active[note][4] = frame
+            active[note] = [frame, note, vel, [], None]
+            spans.append(active[note])
+        elif status == 0x80 and note in active:
+            active[note][3].append(frame)
+    return spans
+
+
+def _render_spans(
+    osc_function,
+    spans,
+    total,
+    sample_rate,
+    num_samples,
+    silence_threshold=0,
+    tuning=None,
+):
+    """
+    Renders each of the note spans as a separate voice, returns a list
+    of (start, float32 block) tuples. Used as the worker function of the
+    parallel renderer so it has to be picklable.
+
+    The voices are rendered in the same parts as by a VoiceManager, up to
+    each note off and to the end of each buffer, at the end of which a
+    released voice stops if it has ended or if it peaked below
+    `silence_threshold` during the buffer.
+    """
+    n = num_samples
+    voices = VoiceManager(osc_function, sample_rate, tuning=tuning)
+    rendered = []
+    for start, note, vel, offs, cut in spans:
+        voice = voices.create_voice(note, vel)
+        has_trigger = hasattr(voice, "trigger_release")
+        end = total if cut is None else min(cut, total)
+        offs = list(reversed(offs))
+        blocks = []
+        pos = start
+        released = False
+        # The level of a voice isn't known in the buffer it starts in.
+        peak = float("inf") if start % n else 0.0
+        while pos < end:
+            while offs and offs[-1] == pos:
+                # Every note off re-triggers the release, as it does
+                # for a voice that is still held by the VoiceManager.
+                offs.pop()
+                if not has_trigger:
+                    end = pos
+                    break
+                voice.trigger_release()
+                released = True
+            if pos >= end:
+                break
+
+            stop = min((pos // n + 1) * n, end, offs[-1] if offs else end)
+            # Copied as compiled voices reuse the array of their output.
+            block = np.array(render_block(voice, stop - pos), dtype=np.float32)
+            blocks.append(block.reshape(stop - pos, -1))
+            peak = max(peak, block_level(block)[0])
+            pos = stop
+            if pos % n == 0:
+                if released and (peak < silence_threshold or voice.ended):
+                    break
+                peak = 0.0
+
+        if blocks:
+            rendered.append((start, np.concatenate(blocks)))
+    return rendered
+
+
+class OfflineRenderer:
+    """
+    Renders a sequence of timestamped MIDI note events without
+    any MIDI or audio device, as fast as the CPU allows.
+
+    The voices are created and mixed the same way as they are by
+    `PolySynth.play`. Events are applied at the frame of their
+    timestamp, the voices they change being mixed in parts around them.
+
+    After every render `.stats` holds the seconds of audio rendered,
+    the wall time it took and their ratio as `realtime_factor`.
+
+    With `workers` > 1 the notes are split into groups of voices that
+    are rendered in separate processes and summed before clipping.
+    Every voice is built by `osc_function` in the worker when its note
+    starts, so the output matches the single process render, for this
+    `osc_function` has to be picklable, i.e. defined at module level.
+    Renders with `max_voices` set, events with pitch bend, and voices
+    that read a ModulationBus passed as `bus`, are always rendered in a
+    single process, as the voices depend on each other.
+
+    Released voices are removed once they peak below `silence_threshold`,
+    by default the level below which they don't change the int16 output.
+    """
+
+    def __init__(
+        self,
+        amp_scale=0.3,
+        max_amp=0.8,
+        sample_rate=44100,
+        num_samples=64,
+        workers=1,
+        max_voices=None,
+        steal="oldest",
+        silence_threshold=None,
+        tuning=None,
+        bus=None,
+    ):
+        if silence_threshold is None:
+            silence_threshold = silence_level(amp_scale)
+        self.silence_threshold = silence_threshold
+        self.tuning = tuning
+        self.bus = bus
+        self.num_samples = num_samples
+        self.workers = workers
+        self.max_voices = max_voices
+        self.steal = steal
+        self.sample_rate = sample_rate
+        self.amp_scale = amp_scale
+        self.max_amp = max_amp
+        self.stats = None
+
+    def render(self, osc_function, events, duration=None, path=None, max_tail=10):
+        """
+        osc_function : function of the signature (freq, amp, sample_rate)
+            that returns a generator for a note, same as for `PolySynth.play`.
+
+        events : iterable of (time, status, note, vel) tuples, `time` is in
+            seconds and status is 0x90 for note on, 0x80 for note off and
+            0xE0 for pitch bend, the low and high 7 bits of the bend being
+            `note` and `vel` as in the MIDI message.
+
+        duration : length of the output in seconds. If None, rendering stops
+            once the events are over and all the voices have ended, or
+            `max_tail` seconds after the last event.
+
+        path : if set, the output is also written to it as a WAV file.
+
+        Returns the rendered audio as an int16 array of shape
+        (frames, nchannels).
+        """
+        start = time.perf_counter()
+        n = self.num_samples
+        events = sorted(events, key=lambda e: e[0])
+        frames = [int(round(e[0] * self.sample_rate)) for e in events]
+
+        if duration is not None:
+            total = int(round(duration * self.sample_rate))
+        else:
+            total = (frames[-1] if frames else 0) + int(max_tail * self.sample_rate)
+
+        nchannels = get_nchannels(osc_function, self.sample_rate)
+        bend = any(e[1] == 0xE0 for e in events)
+        shared = self.bus is not None or self.max_voices is not None
+        if self.workers > 1 and not shared and not bend:
+            render = self._render_parallel
+        else:
+            render = self._render
+        out, pos = render(osc_function, events, frames, total, nchannels)
+        out = out[: total if duration is not None else pos]
+
+        wall = time.perf_counter() - start
+        audio = len(out) / self.sample_rate
+        self.stats = {
+            "audio_seconds": audio,
+            "wall_seconds": wall,
+            "realtime_factor": audio / wall if wall > 0 else float("inf"),
+        }
+
+        if path is not None:
+            write_wav(path, out, self.sample_rate)
+        return out
+
+    def _render(self, osc_function, events, frames, total, nchannels):
+        # Renders until `total` frames or until the events are over and
+        # all the voices have ended, returns the output and the frames
+        # rendered, the rest of the output is silent.
+        n = self.num_samples
+        if self.bus is not None:
+            self.bus.reset()
+        voices = get_voices(
+            osc_function,
+            self.sample_rate,
+            self.max_voices,
+            self.steal,
+            self.silence_threshold,
+            self.tuning,
+            self.bus,
+        )
+        mixer = Mixer(n, nchannels, self.amp_scale, self.max_amp)
+        out = np.zeros((total + n, nchannels), dtype=np.int16)
+
+        pos = 0
+        i = 0
+        while pos < total:
+            if i == len(events) and not voices:
+                break
+
+            due = []
+            while i < len(events) and frames[i] < pos + n:
+                _, status, note, vel = events[i]
+                due.append((frames[i] - pos, status, note, vel))
+                i += 1
+
+            if voices or due:
+                out[pos : pos + n] = voices.mix(mixer, due)
+                voices.remove_ended()
+            pos += n
+
+        return out, pos
+
+    def _render_parallel(self, osc_function, events, frames, total, nchannels):
+        # Imported here as multiprocessing adds to the import time of synth.
+        from concurrent.futures import ProcessPoolExecutor
+
+        n = self.num_samples
+        spans = _get_spans(events, frames)
+
+        # Longest spans first, each to the least loaded group.
+        def length(span):
+            start, _, _, offs, cut = span
+            return min([total, cut or total] + offs[-1:]) - start
+
+        groups = [[] for _ in range(self.workers)]
+        loads = [0] * self.workers
+        for span in sorted(spans, key=length, reverse=True):
+            k = loads.index(min(loads))
+            groups[k].append(span)
+            loads[k] += length(span)
+        groups = [g for g in groups if g]
+
+        pos = (frames[-1] // n + 1) * n if frames else 0
+        acc = np.zeros((total + n, nchannels), dtype=np.float32)
+        with ProcessPoolExecutor(max_workers=len(groups) or 1) as executor:
+            results = executor.map(
+                _render_spans,
+                [osc_function] * len(groups),
+                groups,
+                [total] * len(groups),
+                [self.sample_rate] * len(groups),
+                [n] * len(groups),
+                [self.silence_threshold] * len(groups),
+                [self.tuning] * len(groups),
+            )
+            for rendered in results:
+                for start, block in rendered:
+                    acc[start : start + len(block)] += block
+                    pos = max(pos, start + len(block))
+
+        pos = min(-(-pos // n) * n, -(-total // n) * n)
+        return float_to_int16(acc, self.amp_scale, self.max_amp), pos
@@ -0,0 +1,101 @@
+import heapq
+
+
+class EventScheduler:
+    """
+    Schedules timestamped MIDI events on the frames of the rendered audio
+    so that they are applied at the sample offset they were played at
+    within a buffer, instead of between buffers.
+
+    The timestamps (in ms) are mapped to frames with a fixed offset that is
+    set by the latest of the first events received, which is placed `latency`
+    frames after the start of the buffer being rendered, the other events
+    keep their spacing from it.
+    An event that would fall before the buffer being rendered, such as one
+    delayed by a busy MIDI driver, is applied at the start of the buffer. If
+    it is late by more than a buffer or more than `max_delay` frames ahead,
+    as after the MIDI clock is reset, the offset is set again from it.
+    """
+
+    def __init__(self, sample_rate=44100, num_samples=64, latency=None, batch=256):
+        """
+        sample_rate : the sample rate of the rendered audio.
+        num_samples : number of frames in a buffer.
+        latency : frames between the time of an event and the frame it
+            is applied at, one buffer if None.
+        batch : number of events read from the MIDI input at a time.
+        """
+        self.sample_rate = sample_rate
+        self.num_samples = num_samples
+        self.latency = num_samples if latency is None else latency
+        self.max_delay = self.latency + 4 * num_samples
+        self.batch = batch
+        self.offset = None
+        self._events = []
+        self._count = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, events, position):
+        """
+        Schedules the MIDI messages in `events`, a list of (timestamp,
+        status, note, vel) tuples in the order received, `position` is
+        the first frame of the next buffer to be rendered. Returns the
+        frames the note on messages are scheduled at, in order.
+        """
+        if not events:
+            return []
+        scale = self.sample_rate / 1000
+        last = events[-1][0] * scale
+        if self.offset is not None:
+            frame = last + self.offset
+        if (
+            self.offset is None
+            or frame < position - self.num_samples
+            or frame > position + self.max_delay
+        ):
+            self.offset = position + self.latency - last
+
+        # The count keeps the events of a frame in the order received.
+        note_ons = []
+        for timestamp, status, note, vel in events:
+            frame = max(int(timestamp * scale + self.offset), position)
+            heapq.heappush(self._events, (frame, self._count, status, note, vel))
+            self._count += 1
+            if status == 0x90:
+                note_ons.append(frame)
+        return note_ons
+
+    def drain(self, midi_input, position):
+        """
+        Reads all the pending events of `midi_input` and schedules them,
+        returns the frames the note on messages among them are scheduled
+        at, as `.add` does.
+        """
+        received = []
+        while midi_input.poll():
+            events = midi_input.read(self.batch)
+            if not events:
+                break
+            received.extend(
+                (timestamp, status, note, vel)
+                for (status, note, vel, _), timestamp in events
+            )
+        return self.add(received, position)
+
+    def pop(self, position, num_frames=None):
+        """
+        Returns the events that fall in the `num_frames` frames from
+        `position` as (offset, status, note, vel) tuples sorted by the
+        offset, the frame of the event from `position`.
+        """
+        if num_frames is None:
+            num_frames = self.num_samples
+        stop = position + num_frames
+        events = self._events
+        due = []
+        while events and events[0][0] < stop:
+            frame, _, status, note, vel = heapq.heappop(events)
+            due.append((frame - position, status, note, vel))
+        return due
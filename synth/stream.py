@@ -0,0 +1,303 @@
+"""
+Streaming renders of a component straight to a WAV or raw PCM file a
+block at a time, so that the memory used doesn't grow with the length
+of the render.
+"""
+
+import io
+import os
+import time
+import wave
+import pickle
+import numpy as np
+from .components.blocks import DTYPE, get_state, render_block, set_state
+from .mixer import float_to_int16
+
+
+def wav_header(nchannels, sample_rate, frames):
+    """
+    Returns the header of a 16 bit PCM WAV file of `frames` frames,
+    as written by the wave module.
+    """
+    f = io.BytesIO()
+    with wave.open(f, "wb") as wf:
+        wf.setnchannels(nchannels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.setnframes(frames)
+        wf.writeframesraw(b"")
+        # Taken before the writer is closed, which would set the
+        # number of frames to the ones written through it.
+        return f.getvalue()
+
+
+WAV_HEADER_SIZE = len(wav_header(1, 44100, 0))
+
+
+def write_wav(path, samples, sample_rate=44100):
+    """
+    Writes int16 samples of shape (frames, nchannels)
+    to `path` as a 16 bit PCM WAV file.
+    """
+    writer = PCMWriter(path, samples.shape[1], sample_rate)
+    try:
+        writer.write(samples)
+    finally:
+        writer.close()
+
+
+class PCMWriter:
+    """
+    Writes int16 samples of shape (frames, nchannels) to a 16 bit PCM WAV
+    file, or a raw file without a header if not `wav`, as they come. This
+    is the WAV writer of the package, the header is the one written by the
+    wave module and is updated with the number of frames written on flush.
+
+    If the final number of `frames` is known the file is created at its
+    size and the samples are copied into a memory map of the file, which
+    only maps `window` frames at a time so that the mapped pages don't
+    add up over a long render.
+
+    With `start` > 0 the samples are written from that frame of an
+    existing file on, the frames after it are dropped, as when a render
+    is resumed from a checkpoint.
+    """
+
+    def __init__(
+        self,
+        path,
+        nchannels,
+        sample_rate=44100,
+        wav=True,
+        frames=None,
+        start=0,
+        window=2**20,
+    ):
+        """
+        path : path of the output file.
+        nchannels : number of channels of the samples.
+        sample_rate : the sample rate written to the WAV header.
+        wav : if False the file only has the samples.
+        frames : final number of frames, if set the file is
+            written through a memory map.
+        start : frame the samples are written from.
+        window : number of frames mapped at a time.
+        """
+        self.path = path
+        self.nchannels = nchannels
+        self.sample_rate = sample_rate
+        self.frames = frames
+        self.window = window
+        self.frame = start
+        self._header = WAV_HEADER_SIZE if wav else 0
+        self._frame_bytes = 2 * nchannels
+        self._map = None
+        self._map_start = 0
+
+        self._file = open(path, "r+b" if start > 0 else "w+b")
+        size = start if frames is None else frames
+        self._file.truncate(self._header + size * self._frame_bytes)
+        self._file.seek(self._header + start * self._frame_bytes)
+        self._write_header()
+
+    def _write_header(self):
+        if self._header:
+            frames = self.frame if self.frames is None else self.frames
+            pos = self._file.tell()
+            self._file.seek(0)
+            self._file.write(wav_header(self.nchannels, self.sample_rate, frames))
+            self._file.seek(pos)
+
+    def _remap(self):
+        # Maps the window of frames that starts at the current frame.
+        self._unmap()
+        count = min(self.window, self.frames - self.frame)
+        if count <= 0:
+            raise ValueError(f"more than the {self.frames} frames of the file")
+        self._map = np.memmap(
+            self._file,
+            dtype="<i2",
+            mode="r+",
+            offset=self._header + self.frame * self._frame_bytes,
+            shape=(count, self.nchannels),
+        )
+        self._map_start = self.frame
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+
+    def write(self, samples):
+        """
+        Writes the int16 samples of shape (frames, nchannels).
+        """
+        if self.frames is None:
+            self._file.write(samples.astype("<i2", copy=False).tobytes())
+            self.frame += len(samples)
+            return
+
+        pos = 0
+        while pos < len(samples):
+            if self._map is None or self.frame >= self._map_start + len(self._map):
+                self._remap()
+            i = self.frame - self._map_start
+            count = min(len(samples) - pos, len(self._map) - i)
+            self._map[i : i + count] = samples[pos : pos + count]
+            pos += count
+            self.frame += count
+
+    def flush(self):
+        """
+        Writes out everything written so far, the WAV header
+        is updated with the number of frames written.
+        """
+        if self._map is not None:
+            self._map.flush()
+        self._write_header()
+        self._file.flush()
+
+    def close(self):
+        if self._file is None:
+            return
+        self._unmap()
+        self._write_header()
+        self._file.close()
+        self._file = None
+
+
+class StreamRenderer:
+    """
+    Renders a component, such as a generative piece built from oscillators,
+    modulators and composers, to a file without keeping the output in memory.
+    The blocks pulled from the component are scaled, clipped and converted to
+    int16 one at a time as by the Mixer and written to a PCMWriter, the memory
+    used is the same whatever the length of the render.
+
+    A render can be checkpointed every `checkpoint_interval` seconds of audio:
+    the output written so far is flushed and the state of the component, from
+    its `get_state`, is saved to `checkpoint_path`. A render started again with
+    the same component, path and checkpoint resumes from the last checkpoint
+    instead of from the start, the checkpoint is removed once it is done.
+
+    After every render `.stats` holds the seconds of audio rendered, the
+    wall time it took and their ratio as `realtime_factor`.
+    """
+
+    def __init__(self, amp_scale=0.3, max_amp=0.8, sample_rate=44100, num_samples=4096):
+        """
+        amp_scale : scaling applied to the output of the component.
+        max_amp : the absolute value the scaled output is clipped to.
+        sample_rate : the sample rate of the component.
+        num_samples : number of frames rendered at a time.
+        """
+        self.amp_scale = amp_scale
+        self.max_amp = max_amp
+        self.sample_rate = sample_rate
+        self.num_samples = num_samples
+        self.stats = None
+
+    def blocks(self, component, frames, start=0):
+        """
+        Generator of the output of the iterated `component` from frame
+        `start` to frame `frames`, as int16 blocks of shape (n, nchannels)
+        of at most `num_samples` frames. The block is reused for the next
+        one, so it has to be consumed before the generator is advanced.
+        """
+        acc = out = None
+        pos = start
+        while pos < frames:
+            n = min(self.num_samples, frames - pos)
+            block = np.asarray(render_block(component, n)).reshape(n, -1)
+            if acc is None:
+                shape = (self.num_samples, block.shape[1])
+                acc = np.empty(shape, dtype=DTYPE)
+                out = np.empty(shape, dtype=np.int16)
+            np.copyto(acc[:n], block)
+            yield float_to_int16(acc[:n], self.amp_scale, self.max_amp, out=out[:n])
+            pos += n
+
+    def _load_checkpoint(self, checkpoint_path):
+        if checkpoint_path is None or not os.path.exists(checkpoint_path):
+            return None
+        with open(checkpoint_path, "rb") as f:
+            return pickle.load(f)
+
+    def _save_checkpoint(self, checkpoint_path, checkpoint):
+        # Written to a temporary file first so that a checkpoint
+        # is never left half written.
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(checkpoint, f)
+        os.replace(tmp_path, checkpoint_path)
+
+    def render(
+        self,
+        component,
+        duration,
+        path,
+        wav=True,
+        memmap=False,
+        checkpoint_path=None,
+        checkpoint_interval=60.0,
+    ):
+        """
+        Renders `duration` seconds of `component` to `path`, returns
+        the number of frames rendered.
+
+        wav : if False a raw file of int16 samples is written.
+        memmap : if True the file is created at its final size and
+            written through a memory map, see `PCMWriter`.
+        checkpoint_path : path of the checkpoint, no checkpoints are
+            made if None.
+        checkpoint_interval : seconds of audio between checkpoints.
+        """
+        wall_start = time.perf_counter()
+        frames = int(round(duration * self.sample_rate))
+        every = max(int(round(checkpoint_interval * self.sample_rate)), 1)
+        if checkpoint_path is not None and not hasattr(component, "get_state"):
+            raise TypeError("component should implement get_state for checkpoints")
+
+        iter(component)
+        checkpoint = self._load_checkpoint(checkpoint_path)
+        start = 0
+        if checkpoint is not None:
+            start = checkpoint["frame"]
+            set_state(component, checkpoint["state"])
+
+        writer = None
+        pos = start
+        try:
+            for samples in self.blocks(component, frames, start):
+                if writer is None:
+                    writer = PCMWriter(
+                        path,
+                        samples.shape[1],
+                        self.sample_rate,
+                        wav,
+                        frames if memmap else None,
+                        start,
+                    )
+                writer.write(samples)
+                pos += len(samples)
+                if checkpoint_path is not None and pos % every < len(samples):
+                    if pos < frames:
+                        writer.flush()
+                        state = get_state(component)
+                        checkpoint = {"frame": pos, "state": state}
+                        self._save_checkpoint(checkpoint_path, checkpoint)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if checkpoint_path is not None and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        wall = time.perf_counter() - wall_start
+        audio = (pos - start) / self.sample_rate
+        self.stats = {
+            "audio_seconds": audio,
+            "wall_seconds": wall,
+            "realtime_factor": audio / wall if wall > 0 else float("inf"),
+        }
+        return pos
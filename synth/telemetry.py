@@ -0,0 +1,127 @@
+import json
+import numpy as np
+
+
+class RenderStats:
+    """
+    Per buffer timings of the real time loop kept in fixed size ring
+    buffers, so recording a buffer costs a few array writes and the
+    memory used does not grow while playing.
+
+    For each buffer the time spent rendering, writing and handling MIDI
+    is kept along with the number of active voices. The latency of a note
+    on, the time from it being received to the buffer that contains the
+    frame it is scheduled at being rendered plus the offset of the frame
+    in the buffer, is kept in a separate ring buffer. Buffers whose render
+    time exceeds the buffer deadline (num_samples / sample_rate) are counted
+    as late and output underflows reported by the stream as underruns.
+    """
+
+    def __init__(self, num_samples=64, sample_rate=44100, size=4096):
+        """
+        num_samples : number of frames per buffer.
+        sample_rate : sample rate of the stream.
+        size : number of buffers and note on latencies that are kept.
+        """
+        self.num_samples = num_samples
+        self.sample_rate = sample_rate
+        self.deadline = num_samples / sample_rate
+        self.size = size
+        self._render = np.zeros(size)
+        self._write = np.zeros(size)
+        self._midi = np.zeros(size)
+        self._voices = np.zeros(size, dtype=np.int32)
+        self._latency = np.zeros(size)
+        self._pending = []
+        self.reset()
+
+    def reset(self):
+        self.buffers = 0
+        self.late = 0
+        self.underruns = 0
+        self.notes = 0
+        self._pending.clear()
+
+    def note_received(self, t, frame=None):
+        """
+        Marks a note on received at time `t` (time.perf_counter) that
+        is scheduled at `frame`, its latency is recorded with the buffer
+        that contains the frame, or with the next buffer if None.
+        """
+        self._pending.append((frame, t))
+
+    def record(
+        self, t, render, write=0.0, midi=0.0, voices=0, underrun=False, position=None
+    ):
+        """
+        Records a buffer whose rendering ended at time `t`
+        (time.perf_counter), the durations are in seconds.
+
+        position : first frame of the buffer, the note ons scheduled
+            before the end of the buffer are recorded with it.
+        """
+        i = self.buffers % self.size
+        self._render[i] = render
+        self._write[i] = write
+        self._midi[i] = midi
+        self._voices[i] = voices
+        self.buffers += 1
+        if render > self.deadline:
+            self.late += 1
+        if underrun:
+            self.underruns += 1
+
+        if self._pending:
+            waiting = []
+            for frame, received in self._pending:
+                if frame is None or position is None:
+                    offset = 0
+                elif frame < position + self.num_samples:
+                    offset = max(frame - position, 0)
+                else:
+                    waiting.append((frame, received))
+                    continue
+                latency = t - received + offset / self.sample_rate
+                self._latency[self.notes % self.size] = latency
+                self.notes += 1
+            self._pending[:] = waiting
+
+    @staticmethod
+    def _describe(values, scale=1.0):
+        if len(values) == 0:
+            return None
+        values = values * scale
+        return {
+            "mean": float(values.mean()),
+            "p50": float(np.percentile(values, 50)),
+            "p99": float(np.percentile(values, 99)),
+            "max": float(values.max()),
+        }
+
+    def summary(self):
+        """
+        Returns a dict with the counters and statistics of the
+        buffers in the ring buffer, times are in ms.
+        """
+        n = min(self.buffers, self.size)
+        m = min(self.notes, self.size)
+        render = self._render[:n]
+        return {
+            "buffers": self.buffers,
+            "late": self.late,
+            "underruns": self.underruns,
+            "deadline_ms": self.deadline * 1000,
+            "render_ms": self._describe(render, 1000),
+            "write_ms": self._describe(self._write[:n], 1000),
+            "midi_ms": self._describe(self._midi[:n], 1000),
+            "load": self._describe(render, 1 / self.deadline),
+            "voices": self._describe(self._voices[:n].astype(float)),
+            "note_latency_ms": self._describe(self._latency[:m], 1000),
+        }
+
+    def dump(self, path):
+        """
+        Writes the summary to `path` as JSON.
+        """
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
@@ -0,0 +1,132 @@
+"""
+Tunings that map MIDI notes to frequencies through tables
+that are computed once, in place of computing the frequency
+of a note on every note on.
+"""
+
+import math
+import numpy as np
+
+
+def parse_scala(text):
+    """
+    Returns the ratios of the degrees of a scale in the Scala (.scl)
+    format, from the first degree above the root up to the last,
+    which is the period of the scale (2.0 for an octave).
+
+    text : contents of the .scl file.
+    """
+    lines = [line.strip() for line in text.splitlines() if not line.startswith("!")]
+    count = int(lines[1].split()[0])
+    pitches = [line.split()[0] for line in lines[2:] if line][:count]
+    if count < 1 or len(pitches) < count:
+        raise ValueError("scale should have as many pitches as its count")
+
+    ratios = []
+    for pitch in pitches:
+        if "." in pitch:
+            ratios.append(2 ** (float(pitch) / 1200))
+        else:
+            num, _, den = pitch.partition("/")
+            ratios.append(int(num) / int(den or 1))
+    return ratios
+
+
+class Tuning:
+    """
+    Frequencies of the MIDI notes 0 to 127, 12 tone equal temperament
+    with A4 at `a4` Hz by default, else the notes from `root` on follow
+    the degrees of `scale` and repeat it every period.
+
+    Fractional notes, such as bent ones, are interpolated geometrically
+    between the frequencies of the neighbouring notes of the tuning, so
+    a bend by a note moves to the next note of the scale.
+    """
+
+    def __init__(self, a4=440.0, scale=None, root=69, bend_range=2):
+        """
+        a4 : frequency of A4 (note 69) in Hz.
+        scale : ratios of the degrees of the scale to the root as returned
+            by `parse_scala`, the last being the period, None for 12 tone
+            equal temperament.
+        root : note the scale starts from, its frequency is that of
+            12 tone equal temperament relative to `a4`.
+        bend_range : notes the pitch bend moves by at either extreme.
+        """
+        if scale is None:
+            scale = [2 ** (k / 12) for k in range(1, 13)]
+        self.a4 = a4
+        self.scale = scale
+        self.root = root
+        self.bend_range = bend_range
+
+        ratios = np.array([1.0, *scale[:-1]])
+        octaves, degrees = np.divmod(np.arange(128) - root, len(scale))
+        ref = a4 * 2 ** ((root - 69) / 12)
+        self.freqs = ref * scale[-1] ** octaves * ratios[degrees]
+        self._freq_list = self.freqs.tolist()
+        self._log_freqs = np.log(self.freqs).tolist()
+        self._notes = {round(f, 6): k for k, f in enumerate(self._freq_list)}
+        self._tables = {}
+
+    @classmethod
+    def from_scala(cls, path, a4=440.0, root=60, bend_range=2):
+        """
+        Returns the Tuning of the Scala (.scl) file at `path`.
+        """
+        with open(path) as f:
+            return cls(a4, parse_scala(f.read()), root, bend_range)
+
+    def frequency(self, note, bend=0.0):
+        """
+        Returns the frequency of `note` moved by `bend` notes.
+        """
+        x = note + bend
+        k = min(max(math.floor(x), 0), 126)
+        if x == k:
+            return self._freq_list[k]
+        log_freqs = self._log_freqs
+        lo = log_freqs[k]
+        return math.exp(lo + (log_freqs[k + 1] - lo) * (x - k))
+
+    def bend(self, value):
+        """
+        Returns the notes a 14 bit pitch bend `value` moves
+        by, 8192 being the center.
+        """
+        return self.bend_range * (value - 8192) / 8192
+
+    def _table(self, kind, sample_rate):
+        key = (kind, sample_rate)
+        if key not in self._tables:
+            if kind == "step":
+                table = 2 * math.pi * self.freqs / sample_rate
+            else:
+                table = sample_rate / self.freqs
+            table.flags.writeable = False
+            self._tables[key] = (table, table.tolist())
+        return self._tables[key]
+
+    def steps(self, sample_rate):
+        """
+        Returns the phase steps in radians per sample of
+        the notes, the `_step` of the sine oscillators.
+        """
+        return self._table("step", sample_rate)[0]
+
+    def periods(self, sample_rate):
+        """
+        Returns the periods in samples of the notes, the
+        `_period` of the sawtooth and triangle oscillators.
+        """
+        return self._table("period", sample_rate)[0]
+
+    def lookup(self, kind, freq, sample_rate):
+        """
+        Returns the "step" or "period" of `freq` from the tables if it is
+        the frequency of a note of the tuning, else None.
+        """
+        note = self._notes.get(round(freq, 6))
+        if note is None:
+            return None
+        return self._table(kind, sample_rate)[1][note]
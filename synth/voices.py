@@ -0,0 +1,345 @@
+import numpy as np
+from .components import Chain, Volume
+from .components.blocks import get_channels
+from .tuning import Tuning
+
+
+def get_nchannels(osc_function, sample_rate=44100):
+    """
+    Returns the number of channels of the voices returned by
+    `osc_function` as declared by the voice, if the voice does
+    not declare them they are found by generating a sample.
+    """
+    tempcf = osc_function(1, 1, sample_rate)
+    channels = get_channels(tempcf)
+    if channels is None:
+        channels = np.size(next(tempcf))
+    return channels
+
+
+class VoiceManager:
+    """
+    Keeps track of the voices of the notes that are being played,
+    a voice is created by calling `osc_function` on note on and is
+    released on note off.
+
+    Voices that have `.trigger_release()` are kept until they have
+    `.ended` after being released, other voices are removed on
+    note off. Released voices are also removed once the peak of
+    their last block is below `silence_threshold`, so that long
+    release tails that have become inaudible stop being rendered.
+
+    `.notes` maps a note to [voice, released, peak, rms], the levels
+    being the highest of the voice in the last buffer mixed by `.mix`.
+
+    The frequencies of the notes are those of `tuning`, the voices that
+    implement `.retune(ratio, tuning)` are retuned on note on, so that
+    their oscillators take their steps from the tables of the tuning,
+    and on pitch bend.
+
+    If the voices read a ModulationBus it is passed as `bus`, so that it
+    is ticked at the start of every buffer, see `ModulationBus`.
+    """
+
+    def __init__(
+        self,
+        osc_function,
+        sample_rate=44100,
+        silence_threshold=0,
+        tuning=None,
+        bus=None,
+    ):
+        """
+        osc_function : function of the signature (freq, amp, sample_rate)
+            that returns a generator for a note.
+        sample_rate : the sample rate passed to `osc_function`.
+        silence_threshold : peak level below which a released voice
+            is removed, 0 to only remove voices once they have ended.
+        tuning : instance of Tuning, 12 tone equal temperament if None.
+        bus : the ModulationBus read by the voices, if any.
+        """
+        self.osc_function = osc_function
+        self.sample_rate = sample_rate
+        self.silence_threshold = silence_threshold
+        self.tuning = Tuning() if tuning is None else tuning
+        self.bus = bus
+        self.bend = 0.0
+        self.notes = {}
+        self.released = set()
+        self._levels = []
+        self._cursors = {}
+        self._mixed = {}
+
+    def __len__(self):
+        return len(self.notes)
+
+    def __iter__(self):
+        return (entry[0] for entry in self.notes.values())
+
+    def create_voice(self, note, vel):
+        freq = self.tuning.frequency(note)
+        voice = self.osc_function(
+            freq=freq, amp=vel / 127, sample_rate=self.sample_rate
+        )
+        if hasattr(voice, "retune"):
+            voice.retune(self._ratio(note), self.tuning)
+        return voice
+
+    def _ratio(self, note):
+        # Ratio of the bent frequency of the note to the
+        # frequency its voice was built at.
+        return self.tuning.frequency(note, self.bend) / self.tuning.frequency(note)
+
+    def note_on(self, note, vel):
+        # The levels are unknown until the voice is first mixed.
+        voice = self.create_voice(note, vel)
+        self.notes[note] = [voice, False, float("inf"), float("inf")]
+        self.released.discard(note)
+
+    def note_off(self, note):
+        if note not in self.notes:
+            return
+        voice = self.notes[note][0]
+        if hasattr(voice, "trigger_release"):
+            voice.trigger_release()
+            self.notes[note][1] = True
+            self.released.add(note)
+        else:
+            self._remove(note)
+
+    def pitch_bend(self, value):
+        """
+        Retunes the voices to the 14 bit pitch bend `value`.
+        """
+        self.bend = self.tuning.bend(value)
+        for note, (voice, *_) in self.notes.items():
+            if hasattr(voice, "retune"):
+                voice.retune(self._ratio(note), self.tuning)
+
+    def handle_event(self, status, note, vel):
+        """
+        Applies a MIDI note on (0x90), note off (0x80) or pitch
+        bend (0xE0) message, other messages are ignored.
+        """
+        if status == 0x80:
+            self.note_off(note)
+        elif status == 0x90:
+            self.note_on(note, vel)
+        elif status == 0xE0:
+            self.pitch_bend(note | vel << 7)
+
+    def mix(self, mixer, events=()):
+        """
+        Mixes a buffer of the voices with `mixer`, an instance of
+        `Mixer`, and keeps the levels of each voice over the buffer.
+        Returns the int16 buffer of the mixer.
+
+        events : (offset, status, note, vel) tuples sorted by offset,
+            the MIDI messages are applied `offset` frames into the
+            buffer. Only the voices an event changes are rendered in
+            parts before and after it, all the voices for pitch bend,
+            the other voices are rendered a whole buffer at a time.
+        """
+        self.render(mixer, events)
+        return mixer.convert()
+
+    def render(self, mixer, events=()):
+        """
+        Same as `.mix` but the buffer is left in the float32
+        accumulator of the mixer instead of being converted.
+        """
+        notes = self.notes
+        self._mixed.clear()
+        mixer.clear()
+        if self.bus is not None:
+            self.bus.tick(mixer.num_samples)
+
+        # Frame each voice is rendered up to, those of the voices
+        # that no event has changed yet are at 0.
+        cursors = self._cursors
+        cursors.clear()
+        for offset, status, note, vel in events:
+            for changed in self._changed_by(status, note):
+                start = cursors.get(changed, 0)
+                if start < offset:
+                    self._add(mixer, [notes[changed]], start, offset)
+                    cursors[changed] = offset
+            if self.bus is not None:
+                self.bus.set_offset(offset)
+            self.handle_event(status, note, vel)
+            if status == 0x90 and note in notes:
+                cursors[note] = offset
+
+        parts = {}
+        for note, entry in notes.items():
+            parts.setdefault(cursors.get(note, 0), []).append(entry)
+        for start, entries in parts.items():
+            if start < mixer.num_samples:
+                self._add(mixer, entries, start, mixer.num_samples)
+
+    def _changed_by(self, status, note):
+        # The notes whose voices are changed by an event.
+        if status == 0xE0:
+            return list(self.notes)
+        elif status in (0x80, 0x90) and note in self.notes:
+            return [note]
+        return []
+
+    def _add(self, mixer, entries, start, stop):
+        # Mixes the frames `start` to `stop` of the voices of `entries`,
+        # the levels of the last buffer are kept until the first part
+        # of a voice in this one, so that a steal can compare them.
+        levels = self._levels
+        levels.clear()
+        mixer.add([entry[0] for entry in entries], start, stop, levels)
+        mixed = self._mixed
+        for entry, (peak, rms) in zip(entries, levels):
+            if id(entry) in mixed:
+                entry[2] = max(entry[2], peak)
+                entry[3] = max(entry[3], rms)
+            else:
+                entry[2] = peak
+                entry[3] = rms
+                mixed[id(entry)] = entry
+
+    def remove_ended(self):
+        """
+        Removes the released voices that have ended or that have
+        fallen silent, only the released notes are checked.
+        """
+        if not self.released:
+            return
+        threshold = self.silence_threshold
+        notes = self.notes
+        ended_notes = [
+            note
+            for note in self.released
+            if notes[note][2] < threshold or notes[note][0].ended
+        ]
+        for note in ended_notes:
+            self._remove(note)
+
+    def _remove(self, note):
+        del self.notes[note]
+        self.released.discard(note)
+
+
+class VoicePool(VoiceManager):
+    """
+    A fixed number of voices that are built once by calling `osc_function`
+    and reused for every note instead of building a new voice per note on.
+
+    On note on a free voice is retuned to the note with `.retune()`, its
+    gain is set from the velocity and it is reset with __iter__. When all
+    the voices are in use one of them is stolen according to `steal`.
+    A voice is returned to the pool once it has ended or fallen silent.
+
+    The voices are built with amp=1 and the velocity is applied as a gain
+    after the voice, so `osc_function` should scale linearly with `amp`.
+
+    Only what `.retune()` moves follows the note, as with pitch bend: the
+    oscillators of a voice but not the modulators of a ModulatedOscillator.
+    Modulators that track the note, such as those of an FM patch built at
+    a multiple of `freq`, stay at their frequency for `ref_freq`, so such
+    patches sound as intended only when played by a VoiceManager.
+    """
+
+    STEAL_POLICIES = ("oldest", "quietest", "released")
+
+    def __init__(
+        self,
+        osc_function,
+        sample_rate=44100,
+        max_voices=16,
+        steal="oldest",
+        ref_freq=440,
+        silence_threshold=0,
+        tuning=None,
+        bus=None,
+    ):
+        """
+        max_voices : number of voices in the pool, the most notes
+            that can sound at the same time.
+        steal : which voice is reused when the pool is exhausted,
+            "oldest" : the voice with the earliest note on.
+            "quietest" : the voice with the lowest RMS in its last block.
+            "released" : the oldest released voice, else the oldest one.
+        ref_freq : frequency the voices are built at, the voices are
+            retuned relative to it.
+        """
+        if steal not in self.STEAL_POLICIES:
+            raise ValueError(f"steal should be one of {self.STEAL_POLICIES}")
+
+        super().__init__(osc_function, sample_rate, silence_threshold, tuning, bus)
+        self.steal = steal
+        self.ref_freq = ref_freq
+        self.max_voices = max_voices
+        self.pool = []
+        for _ in range(max_voices):
+            voice = osc_function(freq=ref_freq, amp=1, sample_rate=sample_rate)
+            if not hasattr(voice, "retune"):
+                raise TypeError("voices of a VoicePool should implement retune")
+            self.pool.append(Chain(voice, Volume(1.0)))
+        self.free = list(self.pool)
+
+    def _steal(self):
+        notes = self.notes
+        if self.steal == "quietest":
+            note = min(notes, key=lambda k: notes[k][3])
+        elif self.steal == "released":
+            note = next((k for k, v in notes.items() if v[1]), next(iter(notes)))
+        else:
+            note = next(iter(notes))
+        self.released.discard(note)
+        return notes.pop(note)[0]
+
+    def create_voice(self, note, vel):
+        if note in self.notes:
+            voice = self.notes.pop(note)[0]
+        elif self.free:
+            voice = self.free.pop()
+        else:
+            voice = self._steal()
+
+        voice.retune(self._ratio(note), self.tuning)
+        voice.modifiers[0].amp = vel / 127
+        return iter(voice)
+
+    def _ratio(self, note):
+        return self.tuning.frequency(note, self.bend) / self.ref_freq
+
+    def _changed_by(self, status, note):
+        # A note on that steals a voice changes the note it is stolen from.
+        if status == 0x90 and note not in self.notes and not self.free:
+            return list(self.notes)
+        return super()._changed_by(status, note)
+
+    def _remove(self, note):
+        self.free.append(self.notes.pop(note)[0])
+        self.released.discard(note)
+
+
+def get_voices(
+    osc_function,
+    sample_rate=44100,
+    max_voices=None,
+    steal="oldest",
+    silence_threshold=0,
+    tuning=None,
+    bus=None,
+):
+    """
+    Returns a VoicePool of `max_voices` voices if it is
+    set else a VoiceManager that builds a voice per note.
+    """
+    if max_voices is None:
+        return VoiceManager(osc_function, sample_rate, silence_threshold, tuning, bus)
+    return VoicePool(
+        osc_function,
+        sample_rate,
+        max_voices,
+        steal,
+        silence_threshold=silence_threshold,
+        tuning=tuning,
+        bus=bus,
+    )
@@ -0,0 +1,238 @@
+"""
+Live rendering of the voices of PolySynth across worker processes.
+"""
+
+import math
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from .mixer import Mixer
+from .voices import get_voices
+
+
+def _layout(workers, num_samples, nchannels, max_events):
+    # (name, dtype, shape) of the arrays in the shared memory block,
+    # the widest dtypes first so that every array is aligned.
+    return [
+        ("out", np.float32, (workers, num_samples, nchannels)),
+        ("events", np.int32, (workers, max_events, 4)),
+        ("nevents", np.int32, (workers,)),
+        ("stop", np.int32, (1,)),
+        ("notes", np.uint8, (workers, 128)),
+    ]
+
+
+def _arrays(buf, layout):
+    # The arrays of `layout` as views of the buffer `buf`.
+    arrays = {}
+    offset = 0
+    for name, dtype, shape in layout:
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buf, offset=offset)
+        offset += arrays[name].nbytes
+    return arrays
+
+
+def _size(layout):
+    return sum(
+        np.dtype(dtype).itemsize * math.prod(shape) for _, dtype, shape in layout
+    )
+
+
+def _work(index, shm_name, layout, barrier, voice_args, timeout):
+    # Entry point of a worker process.
+    shm = SharedMemory(name=shm_name)
+    try:
+        _render_loop(index, _arrays(shm.buf, layout), barrier, voice_args, timeout)
+    finally:
+        shm.close()
+
+
+def _render_loop(index, arrays, barrier, voice_args, timeout):
+    # Waits for the events of a buffer, renders the voices of the
+    # worker into its accumulator in shared memory and reports the
+    # notes it still plays, until it is told to stop.
+    voices = get_voices(*voice_args)
+    out = arrays["out"][index]
+    mixer = Mixer(out.shape[0], out.shape[1], acc=out)
+    events = arrays["events"][index]
+    nevents = arrays["nevents"]
+    notes = arrays["notes"][index]
+    while True:
+        barrier.wait(timeout)
+        if arrays["stop"][0]:
+            break
+        voices.render(mixer, events[: nevents[index]].tolist())
+        voices.remove_ended()
+        notes.fill(0)
+        notes[list(voices.notes)] = 1
+        barrier.wait(timeout)
+
+
+class VoiceWorkers:
+    """
+    Voices rendered by `workers` processes, used by PolySynth in place of
+    a VoiceManager to play more voices than a single core can render.
+
+    Each worker has a VoiceManager (or a VoicePool of its share of
+    `max_voices`) and plays the notes that are assigned to it, a new note
+    goes to the worker playing the fewest notes, and the events of a note
+    go to the worker that plays it. Pitch bend goes to all of them.
+
+    For every buffer the events of each worker are written to shared memory
+    and the workers are released through a barrier, each renders its voices
+    into its own float32 block in shared memory, then waits on the barrier
+    again, after which the blocks are summed by the calling process, that
+    only mixes and writes.
+
+    `osc_function` is passed to the workers, it should be picklable when
+    processes are spawned rather than forked. Stealing a voice from a pool
+    only takes from the voices of the same worker. Each worker ticks its
+    own copy of `bus`, so the copies advance in step.
+    """
+
+    def __init__(
+        self,
+        osc_function,
+        sample_rate=44100,
+        num_samples=64,
+        nchannels=1,
+        workers=2,
+        max_voices=None,
+        steal="oldest",
+        silence_threshold=0,
+        tuning=None,
+        max_events=1024,
+        timeout=5,
+        bus=None,
+    ):
+        """
+        osc_function : function of the signature (freq, amp, sample_rate)
+            that returns a generator for a note.
+        nchannels : number of channels of the voices.
+        workers : number of worker processes.
+        max_voices : the most voices of all the workers if set, see
+            `get_voices`.
+        max_events : the most events a worker is passed per buffer,
+            the others are applied at the start of the next buffer.
+        timeout : seconds a process waits for the others on the
+            barrier before it is broken, such as when a worker died.
+        bus : the ModulationBus read by the voices, if any.
+        """
+        self.workers = workers
+        self.num_samples = num_samples
+        self.max_events = max_events
+        self.timeout = timeout
+        self._pending = []
+
+        layout = _layout(workers, num_samples, nchannels, max_events)
+        self._shm = SharedMemory(create=True, size=_size(layout))
+        self._arrays = _arrays(self._shm.buf, layout)
+        self._arrays["nevents"].fill(0)
+        self._arrays["stop"].fill(0)
+        self._arrays["notes"].fill(0)
+
+        if max_voices is not None:
+            max_voices = math.ceil(max_voices / workers)
+        voice_args = (
+            osc_function,
+            sample_rate,
+            max_voices,
+            steal,
+            silence_threshold,
+            tuning,
+            bus,
+        )
+        self._barrier = multiprocessing.Barrier(workers + 1)
+        self._processes = [
+            multiprocessing.Process(
+                target=_work,
+                args=(i, self._shm.name, layout, self._barrier, voice_args, timeout),
+                daemon=True,
+            )
+            for i in range(workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+    def __len__(self):
+        return int(self._arrays["notes"].sum())
+
+    def _assign(self, events):
+        # Splits the events of a buffer between the workers.
+        notes = self._arrays["notes"]
+        loads = notes.sum(axis=1).tolist()
+        owners = {}
+        split = [[] for _ in range(self.workers)]
+        for event in events:
+            offset, status, note, vel = event
+            if status == 0xE0:
+                for worker_events in split:
+                    worker_events.append(event)
+                continue
+            elif status not in (0x80, 0x90):
+                continue
+
+            worker = owners.get(note)
+            if worker is None:
+                playing = np.flatnonzero(notes[:, note])
+                if len(playing):
+                    worker = int(playing[0])
+                elif status == 0x90:
+                    worker = loads.index(min(loads))
+                    loads[worker] += 1
+                else:
+                    continue
+                owners[note] = worker
+            split[worker].append(event)
+        return split
+
+    def mix(self, mixer, events=()):
+        """
+        Mixes a buffer of the voices of all the workers with `mixer`
+        and returns its int16 buffer, `events` are as in
+        `VoiceManager.mix`.
+        """
+        if self._pending:
+            events = self._pending + list(events)
+            self._pending = []
+
+        arrays = self._arrays
+        for i, worker_events in enumerate(self._assign(events)):
+            count = min(len(worker_events), self.max_events)
+            for offset, status, note, vel in worker_events[count:]:
+                self._pending.append((0, status, note, vel))
+            if count:
+                arrays["events"][i, :count] = worker_events[:count]
+            arrays["nevents"][i] = count
+
+        self._barrier.wait(self.timeout)
+        self._barrier.wait(self.timeout)
+        mixer.sum(arrays["out"])
+        return mixer.convert()
+
+    def remove_ended(self):
+        """
+        The workers remove the voices that have ended after
+        each buffer, this is only for the interface of
+        VoiceManager.
+        """
+
+    def close(self):
+        """
+        Stops the workers and frees the shared memory.
+        """
+        if self._shm is None:
+            return
+        self._arrays["stop"][0] = 1
+        try:
+            self._barrier.wait(self.timeout)
+        except Exception:
+            pass
+        for process in self._processes:
+            process.join(self.timeout)
+            if process.is_alive():
+                process.terminate()
+        self._arrays = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
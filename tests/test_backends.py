@@ -0,0 +1,93 @@
+import subprocess
+import sys
+import wave
+
+import numpy as np
+
+from synth import PolySynth
+from synth.backends import (
+    FileMidiInput,
+    MemoryOutput,
+    NullMidiInput,
+    NullOutput,
+    QueueMidiInput,
+    WavOutput,
+)
+from synth.components import SineOscillator
+
+
+def voice(freq, amp, sample_rate):
+    return iter(SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate))
+
+
+def test_headless_synth_does_not_import_pygame_or_pyaudio():
+    code = (
+        "import sys, synth\n"
+        "from synth.backends import NullMidiInput, NullOutput\n"
+        "synth.PolySynth(midi_input=NullMidiInput(), audio_output=NullOutput())\n"
+        "print(any(m in sys.modules for m in ('pygame', 'pyaudio')))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert out.stdout.strip() == "False"
+
+
+class StoppingOutput(MemoryOutput):
+    # Stops the player after `count` buffers, as a Ctrl-C would.
+
+    def __init__(self, count):
+        super().__init__()
+        self.count = count
+
+    def write(self, samples):
+        super().write(samples)
+        if len(self.buffers) == self.count:
+            raise KeyboardInterrupt
+
+
+def test_play_from_a_file(tmp_path):
+    path = tmp_path / "events.txt"
+    path.write_text("# time status note vel\n0 0x90 69 127\n\n10 0x80 69 0\n")
+    output = StoppingOutput(16)
+    synth = PolySynth(midi_input=FileMidiInput(path), audio_output=output)
+    synth.play(voice)
+
+    out = output.samples()
+    assert out.shape == (16 * 64, 1)
+    assert np.abs(out).max() > 0.25 * 32767
+    # Interrupted while writing the last buffer.
+    assert synth.stats.buffers == 15
+
+
+def test_queue_drops_the_oldest_events():
+    midi_input = QueueMidiInput(maxlen=2)
+    assert not midi_input.poll()
+    for note in (60, 62, 64):
+        midi_input.send(0x90, note, 100)
+    assert midi_input.poll()
+    assert [event[0][1] for event in midi_input.read(8)] == [62, 64]
+    assert not NullMidiInput().poll()
+
+
+def test_outputs(tmp_path):
+    samples = (np.arange(200, dtype=np.int16) * 100).reshape(100, 2)
+    memory = MemoryOutput()
+    stream = memory.open(rate=8000, channels=2)
+    stream.write(samples)
+    stream.write(samples.tobytes())
+    stream.close()
+    np.testing.assert_array_equal(memory.samples(), np.concatenate([samples] * 2))
+
+    path = tmp_path / "out.wav"
+    stream = WavOutput(path).open(rate=8000, channels=2)
+    stream.write(samples)
+    stream.close()
+    with wave.open(str(path)) as wf:
+        assert (wf.getnchannels(), wf.getframerate(), wf.getnframes()) == (2, 8000, 100)
+        data = np.frombuffer(wf.readframes(100), dtype="<i2").reshape(100, 2)
+    np.testing.assert_array_equal(data, samples)
+
+    stream = NullOutput().open(rate=8000, channels=2)
+    stream.write(samples)
+    assert stream.is_active()
+    stream.close()
+    assert not stream.is_active()
@@ -0,0 +1,13 @@
+import json
+
+from benchmarks import bench
+
+
+def test_run_writes_the_figures():
+    results = json.loads(json.dumps(bench.run(min_time=0.001, reps=2, limit=2)))
+    assert set(results) == {"meta", "import", "components", "voice_memory", "polysynth"}
+    assert set(results["components"]) == set(bench.COMPONENTS)
+    assert all(rate > 0 for rate in results["components"]["Chain"].values())
+    assert set(results["polysynth"]) == {"64", "256", "1024"}
+    assert results["voice_memory"]["bytes_per_voice"] > 0
+    assert results["import"]["synth"]["heavy_modules"] == []
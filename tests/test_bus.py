@@ -0,0 +1,66 @@
+import numpy as np
+
+from synth import OfflineRenderer
+from synth.components import ModulationBus, SineOscillator
+from synth.components.blocks import render_block
+from synth.mixer import Mixer
+from synth.voices import VoiceManager
+
+
+def lfo_values(n):
+    return render_block(iter(SineOscillator(freq=3)), n)
+
+
+def get_bus():
+    bus = ModulationBus(block=64)
+    bus.add("lfo", SineOscillator(freq=3))
+    return bus
+
+
+def test_sources_advance_when_nothing_reads_them():
+    bus = get_bus()
+    for _ in range(3):
+        bus.tick(64)
+    reader = iter(bus.reader("lfo"))
+    np.testing.assert_array_equal(reader.next_block(64), lfo_values(256)[128:192])
+
+
+def test_readers_start_at_the_frame_of_their_note_on():
+    bus = get_bus()
+
+    def voice(freq, amp, sample_rate):
+        return iter(bus.reader("lfo"))
+
+    voices = VoiceManager(voice, bus=bus)
+    mixer = Mixer(64, 1, amp_scale=1, max_amp=1)
+    voices.render(mixer)
+    voices.render(mixer, [(10, 0x90, 60, 100)])
+    first = mixer._acc[:, 0].copy()
+    voices.render(mixer, [(30, 0x90, 62, 100)])
+    second = mixer._acc[:, 0].copy()
+
+    expected = lfo_values(192)
+    assert not first[:10].any()
+    np.testing.assert_allclose(first[10:], expected[74:128], atol=1e-6)
+    np.testing.assert_allclose(second[:30], expected[128:158], atol=1e-6)
+    np.testing.assert_allclose(second[30:], 2 * expected[158:], atol=1e-6)
+
+
+def test_unticked_bus_advances_as_it_is_read():
+    bus = get_bus()
+    first = iter(bus.reader("lfo"))
+    assert first.next_block(100)[0] == 0
+    second = iter(bus.reader("lfo"))
+    np.testing.assert_array_equal(second.next_block(10), lfo_values(110)[100:])
+
+
+def test_render_restarts_the_bus():
+    bus = get_bus()
+
+    def voice(freq, amp, sample_rate):
+        return iter(bus.reader("lfo"))
+
+    renderer = OfflineRenderer(amp_scale=1, max_amp=1, bus=bus, workers=2)
+    events = [(0.01, 0x90, 60, 100), (0.02, 0x80, 60, 0)]
+    first = renderer.render(voice, events, 0.05)
+    assert renderer.render(voice, events, 0.05).tolist() == first.tolist()
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from synth import OfflineRenderer
+from synth.components import (
+    ADSREnvelope,
+    Chain,
+    Clipper,
+    ModulatedPanner,
+    ModulatedVolume,
+    Panner,
+    SawtoothOscillator,
+    SineOscillator,
+    TriangleOscillator,
+    Volume,
+    WaveAdder,
+    compile_patch,
+)
+from synth.components.blocks import render_block
+from synth.voices import get_nchannels
+
+PATCHES = {
+    "chain": lambda: Chain(SineOscillator(220), Volume(0.5), Clipper((-0.3, 0.3))),
+    "modulated": lambda: Chain(
+        SineOscillator(110),
+        ModulatedVolume(ADSREnvelope(0.01, 0.01, 0.5, 0.01)),
+        ModulatedPanner(SineOscillator(2)),
+    ),
+    "adder": lambda: WaveAdder(SineOscillator(220), TriangleOscillator(330)),
+    "stereo_adder": lambda: WaveAdder(
+        Chain(SineOscillator(220), Panner(0.2)), TriangleOscillator(330), stereo=True
+    ),
+    "downmix": lambda: WaveAdder(
+        Chain(SawtoothOscillator(220), Panner(0.8)), SineOscillator(110)
+    ),
+    # Plain functions that only work on single values.
+    "scalar_function": lambda: Chain(
+        SineOscillator(220), lambda v: max(-0.5, min(0.5, v))
+    ),
+    "stereo_function": lambda: Chain(
+        SineOscillator(220), Panner(0.2), lambda v: (v[1], v[0])
+    ),
+}
+
+
+@pytest.mark.parametrize("name", PATCHES)
+def test_block_path_matches_per_sample_path(name):
+    n = 2048
+    patch = iter(PATCHES[name]())
+    expected = np.array([next(patch) for _ in range(n)])
+    patch = iter(PATCHES[name]())
+    blocks = np.concatenate([render_block(patch, 64) for _ in range(n // 64)])
+    assert blocks.dtype == np.float32
+    assert blocks.shape == expected.shape
+    np.testing.assert_allclose(blocks, expected, atol=2e-5)
+
+
+def widen(val):
+    # Stereo from mono without declaring `out_channels`.
+    val = np.asarray(val)
+    return np.stack((val, 0.5 * val), axis=-1)
+
+
+def wide_voice(freq, amp, sample_rate):
+    osc = SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate)
+    return iter(Chain(osc, Volume(0.5), widen))
+
+
+def test_declared_channels():
+    assert Chain(SineOscillator(), Volume(0.5)).channels == 1
+    assert Chain(SineOscillator(), Panner(0.2), Volume(0.5)).channels == 2
+    assert Chain(SineOscillator(), widen).channels is None
+
+
+def test_undeclared_channels_are_probed():
+    assert get_nchannels(wide_voice) == 2
+    out = OfflineRenderer().render(wide_voice, [(0, 0x90, 69, 100)], 0.05)
+    assert out.shape == (2205, 2)
+    assert np.abs(out[:, 0]).max() > np.abs(out[:, 1]).max() > 0
+
+
+def clipped_voice(freq, amp, sample_rate):
+    osc = SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate)
+    return iter(Chain(osc, lambda v: max(-0.5, min(0.5, v))))
+
+
+def test_scalar_function_modifiers_render():
+    out = OfflineRenderer(amp_scale=1, max_amp=1).render(
+        clipped_voice, [(0, 0x90, 69, 127)], 0.05
+    )
+    assert np.abs(out).max() == pytest.approx(0.5 * 32767, abs=1)
+    compiled = compile_patch(clipped_voice(440, 1, 44100), 64)
+    expected = render_block(clipped_voice(440, 1, 44100), 64)
+    np.testing.assert_allclose(compiled.next_block(64), expected)
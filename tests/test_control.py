@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from synth.components import (
+    ADSREnvelope,
+    Chain,
+    ControlRate,
+    ModulatedOscillator,
+    SineOscillator,
+    Volume,
+    compile_patch,
+)
+from synth.components.blocks import render_block
+from synth.components.control import is_reclockable
+
+
+def full_rate(modulator, n):
+    return render_block(iter(modulator), n)
+
+
+def lfo():
+    return SineOscillator(freq=5, amp=0.5)
+
+
+@pytest.mark.parametrize(
+    "build",
+    [
+        lfo,
+        lambda: Chain(lfo(), Volume(0.5)),
+        lambda: compile_patch(Chain(lfo(), Volume(0.5)), 64),
+        lambda: ModulatedOscillator(lfo(), Chain(lfo(), Volume(0.5))),
+    ],
+    ids=["oscillator", "chain", "plan", "modulated"],
+)
+def test_control_rate_follows_the_modulator(build):
+    n = 44100
+    expected = full_rate(build(), n)
+    blocks = full_rate(ControlRate(build(), k=32), n)
+    assert np.abs(blocks - expected).max() < 1e-3
+
+    control = iter(ControlRate(build(), k=32))
+    samples = np.array([next(control) for _ in range(4096)])
+    assert np.abs(samples - expected[:4096]).max() < 1e-3
+
+
+def test_only_clocked_modulators_are_reclocked():
+    assert is_reclockable(lfo())
+    assert is_reclockable(ADSREnvelope())
+    assert is_reclockable(ModulatedOscillator(lfo(), ADSREnvelope()))
+    assert not is_reclockable(Chain(lfo(), Volume(0.5)))
+    assert not is_reclockable(ModulatedOscillator(lfo(), Chain(lfo())))
+
+    osc = lfo()
+    ControlRate(osc, k=16)
+    assert osc.sample_rate == 44100 / 16
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from synth.components import ADSREnvelope
+from synth.components.blocks import render_block
+
+
+def envelope(curve=0):
+    # Stages of 100, 200 and 300 samples at a sample rate of 1000.
+    return ADSREnvelope(0.1, 0.2, 0.5, 0.3, sample_rate=1000, curve=curve)
+
+
+def per_sample(env, n):
+    return np.array([next(env) for _ in range(n)])
+
+
+def test_stages():
+    env = iter(envelope())
+    vals = per_sample(env, 400)
+    np.testing.assert_allclose(vals[:100], np.arange(100) / 100)
+    assert vals[100] == 1
+    assert vals[200] == pytest.approx(0.75)
+    assert (vals[300:] == 0.5).all()
+
+    env.trigger_release()
+    vals = per_sample(env, 300)
+    np.testing.assert_allclose(vals, 0.5 * (1 - np.arange(300) / 300))
+    assert env.ended
+    assert next(env) == 0
+
+
+@pytest.mark.parametrize("curve", [0, 4])
+@pytest.mark.parametrize("size", [1, 7, 64, 1000])
+def test_next_block_matches_next(curve, size):
+    expected = per_sample(iter(envelope(curve)), 1400)
+    env = iter(envelope(curve))
+    blocks = np.concatenate([render_block(env, size) for _ in range(1400 // size)])
+    np.testing.assert_allclose(blocks, expected[: len(blocks)], atol=1e-6)
+    assert env.val == pytest.approx(blocks[-1])
+
+
+def test_release_mid_stage():
+    # Released during the attack, the release starts from the
+    # value reached and ends after the release duration.
+    expected_env = iter(envelope())
+    expected = per_sample(expected_env, 50)
+    expected_env.trigger_release()
+    expected = np.concatenate([expected, per_sample(expected_env, 350)])
+
+    env = iter(envelope())
+    block = render_block(env, 50)
+    env.trigger_release()
+    block = np.concatenate([block, render_block(env, 350)])
+    np.testing.assert_allclose(block, expected, atol=1e-6)
+    assert block[50] == pytest.approx(0.49)
+    assert not block[350:].any()
+    assert env.ended
+
+
+def test_exponential_curve_reaches_its_targets():
+    env = iter(envelope(curve=4))
+    vals = render_block(env, 400)
+    assert vals[50] > 0.5
+    assert vals[100] == 1
+    assert vals[300] == pytest.approx(0.5)
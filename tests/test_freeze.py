@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+
+from synth import FrozenPatch
+from synth.components import (
+    ADSREnvelope,
+    Chain,
+    ModulatedVolume,
+    Panner,
+    SineOscillator,
+    Volume,
+    compile_patch,
+)
+from synth.components.blocks import render_block
+from synth.mixer import Mixer
+from synth.voices import VoiceManager
+
+
+def voice(freq, amp, sample_rate):
+    osc = SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate)
+    env = ADSREnvelope(0.01, 0.05, 0.6, 0.1, sample_rate=sample_rate)
+    return iter(Chain(osc, ModulatedVolume(env)))
+
+
+def compiled_voice(freq, amp, sample_rate):
+    return iter(compile_patch(voice(freq, amp, sample_rate), 1024))
+
+
+def test_compiled_patch_freezes_like_the_patch():
+    data, _ = FrozenPatch(voice, hold=0.1).get(440, 1)
+    compiled, _ = FrozenPatch(compiled_voice, hold=0.1).get(440, 1)
+    assert data.shape == compiled.shape
+    np.testing.assert_allclose(compiled, data, atol=1e-5)
+
+
+def pitch(samples, sample_rate=44100):
+    # Frequency from the interpolated rising zero crossings.
+    rising = np.flatnonzero((samples[:-1] < 0) & (samples[1:] >= 0))
+    a, b = samples[rising], samples[rising + 1]
+    crossings = rising - a / (b - a)
+    return sample_rate / np.diff(crossings).mean()
+
+
+def sine(freq, amp, sample_rate):
+    return iter(SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate))
+
+
+def test_bend_retunes_a_held_frozen_voice():
+    patch = FrozenPatch(sine, hold=0.2, loop=0.05)
+    voice = patch(440, 1)
+    assert pitch(voice.next_block(4410)) == pytest.approx(440, rel=1e-4)
+
+    ratio = 2 ** (2 / 12)
+    voice.retune(ratio)
+    assert pitch(voice.next_block(22050)) == pytest.approx(440 * ratio, rel=1e-3)
+
+    voice.retune(1)
+    assert pitch(voice.next_block(4410)) == pytest.approx(440, rel=1e-4)
+    assert list(patch.cache) == [(440, 7)]
+
+
+def test_bent_notes_play_the_cached_note():
+    patch = FrozenPatch(sine, hold=0.2, loop=0.05)
+    patch.prerender([440])
+    voices = VoiceManager(patch)
+    voices.pitch_bend(16383)
+    mixer = Mixer(64, 1)
+    voices.mix(mixer, [(0, 0x90, 69, 127)])
+    samples = np.concatenate([voices.mix(mixer).copy() for _ in range(300)])
+    assert pitch(samples[:, 0].astype(float)) == pytest.approx(493.88, rel=1e-3)
+    assert len(patch.cache) == patch.velocity_buckets
+
+
+def test_frozen_voice_plays_the_patch():
+    patch = FrozenPatch(voice, hold=0.1, loop=0.02)
+    start, _ = patch._loop_points(440)
+    live = render_block(voice(440, 0.3, 44100), start - patch.fade)
+    frozen = render_block(patch(440, 0.3), start - patch.fade)
+    np.testing.assert_allclose(frozen, live, atol=1e-5)
+
+
+def test_loop_and_release():
+    patch = FrozenPatch(voice, hold=0.1, loop=0.02)
+    frozen = patch(440, 1)
+    held = render_block(frozen, 44100)
+    # The loop wraps around without a click, a step of the sine
+    # of the sustain level is at most 0.6 * 2 * pi * 440 / 44100.
+    start, _ = patch._loop_points(440)
+    assert np.abs(np.diff(held[start:])).max() < 0.04
+    assert np.abs(held[-441:]).max() == pytest.approx(0.6, abs=0.01)
+
+    frozen.trigger_release()
+    for _ in range(100):
+        if frozen.ended:
+            break
+        block = render_block(frozen, 441)
+    assert frozen.ended
+    assert np.abs(block).max() < 0.01
+
+
+def test_cache_is_bounded():
+    patch = FrozenPatch(voice, hold=0.1, velocity_buckets=1)
+    size = patch.get(440, 1)[0].nbytes
+    patch.max_bytes = 2 * size
+    for freq in (440, 550, 660, 440, 770):
+        patch.get(freq, 1)
+    assert list(patch.cache) == [(440, 0), (770, 0)]
+    assert patch.nbytes <= patch.max_bytes
+
+
+def test_cache_dir(tmp_path):
+    data, _ = FrozenPatch(voice, hold=0.1, cache_dir=tmp_path).get(440, 1)
+    assert len(list(tmp_path.glob("*.npy"))) == 1
+
+    def fails(freq, amp, sample_rate):
+        raise AssertionError("the note should be loaded from the cache")
+
+    loaded, _ = FrozenPatch(fails, hold=0.1, cache_dir=tmp_path).get(440, 1)
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, data)
+
+
+def panned(freq, amp, sample_rate):
+    return Chain(voice(freq, amp, sample_rate), Panner(0.3))
+
+
+@pytest.mark.parametrize("patch", [voice, panned])
+def test_per_sample_path(patch):
+    frozen = FrozenPatch(patch, hold=0.1)
+    chain = iter(Chain(frozen(440, 1), Volume(0.5)))
+    vals = [next(chain) for _ in range(100)]
+    expected = render_block(iter(Chain(frozen(440, 1), Volume(0.5))), 100)
+    assert all(isinstance(v, (float, tuple)) for v in vals)
+    np.testing.assert_allclose(np.array(vals), expected, atol=1e-6)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from synth.components import Chain, Panner, SawtoothOscillator, SineOscillator
+from synth.mixer import Mixer, block_level
+
+
+def get_voices():
+    return [
+        iter(SineOscillator(freq=220)),
+        iter(SawtoothOscillator(freq=330, amp=0.8)),
+        iter(Chain(SineOscillator(freq=440), Panner(0.25))),
+    ]
+
+
+def test_mix_matches_the_per_sample_sum():
+    voices = get_voices()
+    samples = []
+    for _ in range(64):
+        # Mono voices are copied to both channels.
+        vals = [np.broadcast_to(next(voice), 2) for voice in voices]
+        samples.append(np.sum(vals, axis=0))
+    samples = np.array(samples) * 0.3
+    expected = np.int16(samples.clip(-0.8, 0.8) * 32767)
+
+    out = Mixer(64, 2, 0.3, 0.8).mix(get_voices())
+    assert out.dtype == np.int16 and out.shape == (64, 2)
+    assert np.abs(out.astype(int) - expected).max() <= 1
+
+
+def test_buffers_are_reused():
+    mixer = Mixer(64, 2)
+    voices = get_voices()
+    out = mixer.mix(voices)
+    assert mixer.mix(voices) is out
+    assert mixer.accumulate(voices) is mixer.accumulate(voices)
+
+
+def test_add_renders_a_buffer_in_parts():
+    mixer = Mixer(64, 1, amp_scale=1, max_amp=1)
+    levels = []
+    mixer.clear()
+    voice = iter(SineOscillator(freq=440))
+    mixer.add([voice], 0, 20, levels)
+    mixer.add([voice], 20, 64, levels)
+
+    expected = iter(SineOscillator(freq=440)).next_block(64)
+    np.testing.assert_allclose(mixer._acc[:, 0], expected, atol=1e-6)
+    assert levels == [block_level(expected[:20]), block_level(expected[20:])]
@@ -0,0 +1,53 @@
+import math
+
+import numpy as np
+import pytest
+
+from synth.components import ModulatedOscillator, SineOscillator, TriangleOscillator
+from synth.components.blocks import render_block
+
+
+def modulated(**mods):
+    carrier = SineOscillator(freq=440, amp=0.8)
+    lfo = TriangleOscillator(freq=110, wave_range=(0, 1))
+    return ModulatedOscillator(carrier, lfo, control_rate=1, **mods)
+
+
+MODS = {
+    "fm": dict(freq_mod=lambda f, v: f * (1 + 0.5 * v)),
+    "am": dict(amp_mod=lambda a, v: a * v),
+    "pm": dict(phase_mod=lambda p, v: p + 90 * v),
+    "all": dict(
+        freq_mod=lambda f, v: f + 200 * v,
+        amp_mod=lambda a, v: a * (1 - v),
+        phase_mod=lambda p, v: p - 45 * v,
+    ),
+}
+
+
+@pytest.mark.parametrize("name", MODS)
+@pytest.mark.parametrize("size", [1, 64, 100])
+def test_next_block_matches_next(name, size):
+    osc = iter(modulated(**MODS[name]))
+    expected = np.array([next(osc) for _ in range(1600)])
+    osc = iter(modulated(**MODS[name]))
+    blocks = np.concatenate([render_block(osc, size) for _ in range(1600 // size)])
+    assert blocks.dtype == np.float32
+    np.testing.assert_allclose(blocks, expected, atol=1e-4)
+
+
+def test_fm_integrates_the_frequency():
+    # A constant frequency modulation plays the modulated frequency.
+    osc = iter(modulated(freq_mod=lambda f, v: 2 * f))
+    expected = render_block(iter(SineOscillator(freq=880, amp=0.8)), 1000)
+    np.testing.assert_allclose(render_block(osc, 1000), expected, atol=1e-4)
+
+
+def test_scalar_mod_functions():
+    scalar = dict(freq_mod=lambda f, v: f * math.exp(v), amp_mod=lambda a, v: 0.5)
+    osc = iter(modulated(**scalar))
+    expected = np.array([next(osc) for _ in range(640)])
+    osc = iter(modulated(**scalar))
+    blocks = np.concatenate([render_block(osc, 64) for _ in range(10)])
+    np.testing.assert_allclose(blocks, expected, atol=1e-4)
+    assert osc.oscillator.amp == 0.5
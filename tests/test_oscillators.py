@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from synth.components.blocks import render_block
+from synth.components.oscillators import (
+    SineOscillator,
+    SquareOscillator,
+    SawtoothOscillator,
+    TriangleOscillator,
+)
+
+
+def per_sample(osc, n):
+    osc = iter(osc)
+    return np.array([next(osc) for _ in range(n)])
+
+
+def in_blocks(osc, n, size):
+    osc = iter(osc)
+    return np.concatenate([render_block(osc, size) for _ in range(n // size)])
+
+
+@pytest.mark.parametrize(
+    "cls", [SineOscillator, SawtoothOscillator, TriangleOscillator]
+)
+@pytest.mark.parametrize("size", [1, 64, 100])
+def test_next_block_matches_next(cls, size):
+    kwargs = dict(freq=331, phase=30, amp=0.7)
+    expected = per_sample(cls(**kwargs), 1600)
+    blocks = in_blocks(cls(**kwargs), 1600, size)
+    assert blocks.dtype == np.float32
+    np.testing.assert_allclose(blocks, expected, atol=1e-6)
+
+
+def test_square_next_block_matches_next():
+    expected = per_sample(SquareOscillator(freq=220), 4096)
+    blocks = in_blocks(SquareOscillator(freq=220), 4096, 64)
+    np.testing.assert_allclose(blocks, expected, atol=1e-6)
+
+
+def test_next_block_wave_range():
+    osc = iter(SineOscillator(freq=100, wave_range=(0, 1)))
+    block = render_block(osc, 441)
+    assert block.min() >= 0
+    assert block.max() == pytest.approx(1, abs=1e-4)
+
+
+@pytest.mark.parametrize(
+    "cls", [SineOscillator, SquareOscillator, SawtoothOscillator, TriangleOscillator]
+)
+def test_retune_keeps_the_phase(cls):
+    osc = iter(cls(freq=441))
+    before = render_block(osc, 44100 + 7)
+    osc.retune(2 ** (5 / 1200))
+    after = render_block(osc, 1)
+    # The next sample is a step of the wave away from the last one.
+    expected = render_block(iter(cls(freq=441)), 44100 + 8)[-1]
+    assert after[0] == pytest.approx(expected, abs=0.05)
+    assert abs(after[0] - before[-1]) < 0.1
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from synth import PolySynth
+from synth.backends import NullMidiInput, NullOutput, QueueMidiInput
+from synth.components import SineOscillator
+
+
+def voice(freq, amp, sample_rate):
+    return iter(SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate))
+
+
+class Stream:
+    # Output stream that pulls a buffer from the callback every time
+    # the player checks it is active, for `count` buffers.
+
+    def __init__(self, stream_callback, frames_per_buffer, count):
+        self.callback = stream_callback
+        self.frames = frames_per_buffer
+        self.count = count
+        self.buffers = []
+
+    def is_active(self):
+        if len(self.buffers) == self.count:
+            return False
+        samples, _ = self.callback(None, self.frames, {}, 0)
+        self.buffers.append(samples.copy())
+        return True
+
+    def close(self):
+        pass
+
+
+def test_callback_plays_the_queued_notes():
+    midi_input = QueueMidiInput()
+    midi_input.send(0x90, 69, 127, timestamp=0)
+    streams = []
+
+    def open_stream(**kwargs):
+        streams.append(Stream(kwargs["stream_callback"], 64, 8))
+        return streams[0]
+
+    synth = PolySynth(midi_input=midi_input, audio_output=object())
+    synth.play_callback(voice, open_stream=open_stream, poll_interval=0)
+
+    out = np.concatenate(streams[0].buffers)[:, 0]
+    # Received before the second buffer, played a buffer later.
+    assert not out[:128].any()
+    assert np.abs(out[128:]).max() > 0.25 * 32767
+    assert synth.stats.notes == 1
+    assert synth.stats.summary()["note_latency_ms"]["max"] >= 0
+
+
+class FailingStream:
+    # Output stream whose writes raise `error`.
+
+    def __init__(self, error):
+        self.error = error
+
+    def write(self, samples, num_frames=None, exception_on_underflow=False):
+        raise self.error
+
+
+def test_only_underflows_count_as_underruns():
+    synth = PolySynth(midi_input=NullMidiInput(), audio_output=NullOutput())
+    samples = np.zeros((64, 1), dtype=np.int16)
+    synth.stream = FailingStream(IOError(-9980, "Output underflowed"))
+    assert synth._write(samples)
+
+    synth.stream = FailingStream(IOError(-9988, "Stream closed"))
+    with pytest.raises(IOError):
+        synth._write(samples)
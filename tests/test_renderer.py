@@ -0,0 +1,105 @@
+import wave
+
+import numpy as np
+
+from synth import OfflineRenderer
+from synth.renderer import _get_spans
+from synth.components import (
+    ADSREnvelope,
+    Chain,
+    ModulatedVolume,
+    SawtoothOscillator,
+    SineOscillator,
+    compile_patch,
+)
+
+
+def voice(freq, amp, sample_rate):
+    osc = SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate)
+    env = ADSREnvelope(0.01, 0.05, 0.6, 0.05, sample_rate=sample_rate)
+    return iter(Chain(osc, ModulatedVolume(env)))
+
+
+def compiled_voice(freq, amp, sample_rate):
+    return iter(compile_patch(voice(freq, amp, sample_rate), 64))
+
+
+def get_events():
+    events = []
+    for k, note in enumerate([60, 64, 67, 71, 72]):
+        events.append((0.013 * k, 0x90, note, 100))
+        events.append((0.013 * k + 0.07, 0x80, note, 0))
+    return events
+
+
+def test_parallel_render_of_compiled_patch_matches_serial():
+    serial = OfflineRenderer(workers=1).render(compiled_voice, get_events(), 0.3)
+    parallel = OfflineRenderer(workers=2).render(compiled_voice, get_events(), 0.3)
+    assert serial.shape == parallel.shape
+    assert np.abs(serial.astype(int) - parallel).max() <= 1
+
+
+def test_render_matches_the_voice():
+    renderer = OfflineRenderer(amp_scale=0.5, max_amp=1.0)
+    out = renderer.render(voice, [(0.01, 0x90, 69, 127)], duration=0.1)
+    assert out.shape == (4410, 1)
+    assert not out[:441].any()
+
+    expected = voice(440, 1.0, 44100).next_block(4410 - 441)
+    expected = np.int16(expected * 0.5 * 32767)
+    assert np.abs(out[441:, 0].astype(int) - expected).max() <= 1
+    assert renderer.stats["audio_seconds"] == 0.1
+
+
+def test_render_stops_once_the_voices_have_ended(tmp_path):
+    path = tmp_path / "out.wav"
+    events = [(0, 0x90, 60, 100), (0.1, 0x80, 60, 0)]
+    out = OfflineRenderer().render(voice, events, path=path)
+    # The release is 0.05 seconds long, rendered in buffers of 64.
+    assert 0.15 * 44100 <= len(out) < 0.15 * 44100 + 128
+    assert len(out) % 64 == 0
+
+    with wave.open(str(path), "rb") as wf:
+        assert wf.getnframes() == len(out)
+        frames = np.frombuffer(wf.readframes(len(out)), dtype="<i2")
+    np.testing.assert_array_equal(frames, out[:, 0])
+
+
+def saw_voice(freq, amp, sample_rate):
+    osc = SawtoothOscillator(freq=freq, amp=amp, sample_rate=sample_rate)
+    env = ADSREnvelope(0.005, 0.05, 0.5, 0.1, sample_rate=sample_rate)
+    return iter(Chain(osc, ModulatedVolume(env)))
+
+
+def test_spans_of_retriggered_notes():
+    events = [(0, 0x90, 60, 100), (0, 0x80, 60, 0), (0, 0x90, 60, 90)]
+    events += [(0, 0x80, 60, 0), (0, 0x90, 62, 80)]
+    spans = _get_spans(events, [0, 100, 150, 300, 310])
+    assert spans == [
+        [0, 60, 100, [100], 150],
+        [150, 60, 90, [300], None],
+        [310, 62, 80, [], None],
+    ]
+
+
+def test_parallel_render_matches_serial():
+    events = []
+    for k in range(16):
+        t = 0.0173 * k
+        note = 48 + k % 5
+        events.append((t, 0x90, note, 60 + 4 * k))
+        events.append((t + 0.05 + 0.01 * (k % 3), 0x80, note, 0))
+
+    serial = OfflineRenderer(workers=1).render(saw_voice, events)
+    parallel = OfflineRenderer(workers=3).render(saw_voice, events)
+    assert serial.shape == parallel.shape
+    assert np.abs(serial.astype(int) - parallel).max() <= 1
+
+
+def test_limited_polyphony_is_rendered_like_serial():
+    events = [(0.01 * k, 0x90, 48 + 3 * k, 100) for k in range(8)]
+    events += [(0.2, 0x80, 48 + 3 * k, 0) for k in range(8)]
+    kwargs = dict(max_voices=2, steal="oldest")
+    serial = OfflineRenderer(workers=1, **kwargs).render(saw_voice, events, 0.3)
+    parallel = OfflineRenderer(workers=3, **kwargs).render(saw_voice, events, 0.3)
+    np.testing.assert_array_equal(parallel, serial)
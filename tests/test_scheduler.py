@@ -0,0 +1,36 @@
+import pytest
+
+from synth.scheduler import EventScheduler
+from synth.telemetry import RenderStats
+
+
+def test_events_keep_their_spacing_after_the_latency():
+    scheduler = EventScheduler(44100, 64, latency=64)
+    # Timestamps in ms, 1 ms is 44.1 frames, the last event of the
+    # first batch is placed a buffer after the one being rendered.
+    events = [(0, 0x90, 60, 100), (1, 0x90, 64, 100)]
+    assert scheduler.add(events, position=128) == [147, 192]
+    assert scheduler.pop(128) == [(19, 0x90, 60, 100)]
+    assert scheduler.pop(192) == [(0, 0x90, 64, 100)]
+    assert not scheduler
+
+
+def test_late_events_are_played_at_the_start_of_the_buffer():
+    scheduler = EventScheduler(44100, 64, latency=64)
+    scheduler.add([(0, 0x90, 60, 100), (1, 0x90, 64, 100)], position=128)
+    scheduler.pop(128)
+    scheduler.pop(192)
+    # Due at frame 236, received while the buffer at 256 is next.
+    scheduler.add([(2, 0x80, 60, 0)], position=256)
+    assert scheduler.pop(256) == [(0, 0x80, 60, 0)]
+
+
+def test_note_latency_includes_the_scheduled_offset():
+    stats = RenderStats(64, 44100)
+    stats.note_received(1.0, frame=64 + 441)
+    # The note falls in the 8th buffer, 505 - 7 * 64 = 57 frames in.
+    for k in range(9):
+        stats.record(1.0 + 0.001 * k, 0.0005, position=64 * k)
+        assert stats.notes == (k >= 7)
+    latency = stats.summary()["note_latency_ms"]["max"]
+    assert latency == pytest.approx(7 + 1000 * 57 / 44100)
@@ -0,0 +1,91 @@
+import sys
+
+import pytest
+
+from benchmarks import bench
+from synth.components import (
+    ADSREnvelope,
+    Chain,
+    Clipper,
+    ControlRate,
+    ModulatedOscillator,
+    ModulatedPanner,
+    ModulatedVolume,
+    ModulationBus,
+    Panner,
+    SawtoothOscillator,
+    SineOscillator,
+    SquareOscillator,
+    TriangleOscillator,
+    Volume,
+    WaveAdder,
+    WavetableOscillator,
+)
+
+bus = ModulationBus()
+bus.add("lfo", SineOscillator(freq=2))
+
+COMPONENTS = [
+    SineOscillator(),
+    SquareOscillator(),
+    SawtoothOscillator(),
+    TriangleOscillator(),
+    WavetableOscillator(),
+    ModulatedOscillator(SineOscillator(), SineOscillator(freq=5)),
+    ADSREnvelope(),
+    ControlRate(SineOscillator(freq=5), 16),
+    Chain(SineOscillator(), Volume(0.5)),
+    WaveAdder(SineOscillator(), SineOscillator(freq=220)),
+    Volume(),
+    ModulatedVolume(ADSREnvelope()),
+    Panner(),
+    ModulatedPanner(SineOscillator(freq=1)),
+    Clipper(),
+    bus.reader("lfo"),
+]
+
+
+@pytest.mark.parametrize("component", COMPONENTS, ids=lambda c: type(c).__name__)
+def test_components_have_no_dict(component):
+    if hasattr(component, "__iter__"):
+        iter(component)
+    assert not hasattr(component, "__dict__")
+    with pytest.raises(AttributeError):
+        component.misspelt = 1
+
+
+def slot_values(obj):
+    # The values of the slots of `obj` that are set.
+    names = [
+        name for cls in type(obj).__mro__ for name in getattr(cls, "__slots__", ())
+    ]
+    return {name: getattr(obj, name) for name in names if hasattr(obj, name)}
+
+
+def components(obj, seen=None):
+    # `obj` and the components it is built from, each once.
+    seen = set() if seen is None else seen
+    seen.add(id(obj))
+    yield obj
+    for val in slot_values(obj).values():
+        for v in val if isinstance(val, (tuple, list)) else [val]:
+            if type(v).__module__.startswith("synth.") and id(v) not in seen:
+                yield from components(v, seen)
+
+
+class Plain:
+    # A component with its values in an instance dict.
+    pass
+
+
+def test_voice_memory():
+    voice = bench.get_voice()
+    slotted = dict_based = 0
+    for component in components(voice):
+        plain = Plain()
+        plain.__dict__.update(slot_values(component))
+        slotted += sys.getsizeof(component)
+        dict_based += sys.getsizeof(plain) + sys.getsizeof(plain.__dict__)
+    assert len(list(components(voice))) >= 6
+    assert slotted < dict_based
+    assert bench.bench_voice_memory(16)["bytes_per_voice"] > 0
@@ -0,0 +1,57 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from synth.components import (
+    ADSREnvelope,
+    Chain,
+    Clipper,
+    ModulatedOscillator,
+    ModulatedPanner,
+    ModulatedVolume,
+    SawtoothOscillator,
+    SineOscillator,
+    TriangleOscillator,
+    WaveAdder,
+)
+from synth.components.blocks import get_state, render_block, set_state
+
+
+def patch():
+    lfo = SineOscillator(freq=3, wave_range=(0, 1))
+    carrier = ModulatedOscillator(
+        SawtoothOscillator(freq=220),
+        lfo,
+        freq_mod=lambda f, v: f * (1 + 0.01 * v),
+        control_rate=16,
+    )
+    adder = WaveAdder(carrier, TriangleOscillator(freq=330, amp=0.5))
+    env = ADSREnvelope(0.01, 0.05, 0.6, 0.1)
+    pan = TriangleOscillator(freq=0.5, wave_range=(0, 1))
+    return Chain(adder, ModulatedVolume(env), Clipper(), ModulatedPanner(pan))
+
+
+@pytest.mark.parametrize("release", [False, True])
+def test_restored_patch_continues_where_it_was(release):
+    voice = iter(patch())
+    render_block(voice, 1000)
+    if release:
+        voice.trigger_release()
+        render_block(voice, 300)
+    state = get_state(voice)
+    expected = render_block(voice, 5000).copy()
+
+    restored = iter(patch())
+    set_state(restored, pickle.loads(pickle.dumps(state)))
+    np.testing.assert_array_equal(render_block(restored, 5000), expected)
+    assert get_state(restored) == get_state(voice)
+
+
+def test_states_are_snapshots():
+    voice = iter(patch())
+    render_block(voice, 100)
+    state = get_state(voice)
+    render_block(voice, 100)
+    assert state != get_state(voice)
+    assert not hasattr(state, "__dict__")
@@ -0,0 +1,109 @@
+import pickle
+import wave
+
+import numpy as np
+import pytest
+
+from synth import StreamRenderer
+from synth.backends import WavOutput
+from synth.components import (
+    ADSREnvelope,
+    Chain,
+    ModulatedVolume,
+    Panner,
+    SineOscillator,
+)
+from synth.renderer import write_wav
+from synth.stream import PCMWriter
+
+
+def read_wav(path):
+    with wave.open(str(path), "rb") as wf:
+        frames = wf.readframes(wf.getnframes())
+        samples = np.frombuffer(frames, dtype="<i2")
+        return wf.getframerate(), samples.reshape(-1, wf.getnchannels())
+
+
+def get_samples(frames=1000, nchannels=2):
+    return np.arange(frames * nchannels, dtype=np.int16).reshape(frames, -1)
+
+
+@pytest.mark.parametrize("memmap", [False, True])
+def test_pcm_writer_writes_a_wav_file(tmp_path, memmap):
+    samples = get_samples()
+    path = tmp_path / "out.wav"
+    writer = PCMWriter(path, 2, 48000, frames=1000 if memmap else None, window=300)
+    for k in range(0, 1000, 64):
+        writer.write(samples[k : k + 64])
+    writer.close()
+    rate, read = read_wav(path)
+    assert rate == 48000
+    np.testing.assert_array_equal(read, samples)
+
+
+def test_wav_writers_match(tmp_path):
+    samples = get_samples()
+    write_wav(tmp_path / "a.wav", samples, 22050)
+
+    output = WavOutput(tmp_path / "b.wav")
+    stream = output.open(rate=22050, channels=2)
+    stream.write(samples[:500])
+    stream.write(samples[500:])
+    stream.close()
+    assert (tmp_path / "a.wav").read_bytes() == (tmp_path / "b.wav").read_bytes()
+
+
+def patch():
+    osc = SineOscillator(freq=220)
+    env = ADSREnvelope(0.05, 0.1, 0.5, 0.1)
+    return Chain(osc, ModulatedVolume(env), Panner(0.3))
+
+
+class Interrupted(Exception):
+    pass
+
+
+class Interrupt:
+    # Interrupts the render once `count` blocks have been rendered.
+
+    def __init__(self, component, count):
+        self.component = component
+        self.count = count
+
+    def __iter__(self):
+        iter(self.component)
+        return self
+
+    def __next__(self):
+        return next(self.component)
+
+    def next_block(self, n):
+        if self.count == 0:
+            raise Interrupted()
+        self.count -= 1
+        return self.component.next_block(n)
+
+    def get_state(self):
+        return self.component.get_state()
+
+    def set_state(self, state):
+        self.component.set_state(state)
+
+
+@pytest.mark.parametrize("memmap", [False, True])
+def test_resumed_render_matches_a_single_render(tmp_path, memmap):
+    renderer = StreamRenderer(num_samples=1000)
+    renderer.render(patch(), 1.0, tmp_path / "full.wav", memmap=memmap)
+
+    path = tmp_path / "resumed.wav"
+    checkpoint = tmp_path / "render.ckpt"
+    args = (1.0, path, True, memmap, checkpoint, 0.1)
+    with pytest.raises(Interrupted):
+        renderer.render(Interrupt(patch(), 25), *args)
+    # Checkpointed after the block that passes every 0.1 seconds.
+    with open(checkpoint, "rb") as f:
+        assert pickle.load(f)["frame"] == 23000
+
+    assert renderer.render(patch(), *args) == 44100
+    assert not checkpoint.exists()
+    assert path.read_bytes() == (tmp_path / "full.wav").read_bytes()
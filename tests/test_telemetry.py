@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from synth.telemetry import RenderStats
+
+
+def test_late_buffers_and_underruns():
+    stats = RenderStats(num_samples=441, sample_rate=44100)
+    assert stats.deadline == pytest.approx(0.01)
+    stats.record(1.0, 0.005)
+    stats.record(1.0, 0.02, underrun=True)
+    stats.record(1.0, 0.011)
+    assert (stats.buffers, stats.late, stats.underruns) == (3, 2, 1)
+
+
+def test_ring_buffer_keeps_the_last_buffers():
+    stats = RenderStats(num_samples=441, sample_rate=44100, size=4)
+    for k in range(10):
+        stats.record(1.0, 0.001 * k, voices=k)
+    summary = stats.summary()
+    assert summary["buffers"] == 10
+    assert summary["render_ms"]["mean"] == pytest.approx(7.5)
+    assert summary["render_ms"]["max"] == pytest.approx(9)
+    assert summary["load"]["max"] == pytest.approx(0.9)
+    assert summary["voices"]["mean"] == pytest.approx(7.5)
+
+
+def test_note_latency_without_a_frame():
+    stats = RenderStats(num_samples=64, sample_rate=44100)
+    assert stats.summary()["note_latency_ms"] is None
+    stats.note_received(1.0)
+    stats.record(1.004, 0.001)
+    assert stats.notes == 1
+    assert stats.summary()["note_latency_ms"]["max"] == pytest.approx(4)
+
+
+def test_reset_and_dump(tmp_path):
+    stats = RenderStats()
+    stats.record(1.0, 1.0, underrun=True)
+    stats.reset()
+    assert (stats.buffers, stats.late, stats.underruns) == (0, 0, 0)
+
+    stats.record(1.0, 0.0005, write=0.001, midi=0.0001, voices=3)
+    path = tmp_path / "stats.json"
+    stats.dump(path)
+    summary = json.loads(path.read_text())
+    assert summary["buffers"] == 1
+    assert summary["write_ms"]["p50"] == pytest.approx(1)
+    assert summary["voices"]["max"] == 3
@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+import pytest
+
+from synth import Tuning
+from synth.components import Chain, SawtoothOscillator, SineOscillator, Volume
+from synth.components.blocks import render_block
+from synth.tuning import parse_scala
+from synth.voices import VoiceManager, VoicePool
+
+JUST = """! just.scl
+Just major
+ 7
+!
+ 9/8
+ 5/4
+ 4/3
+ 3/2
+ 5/3
+ 15/8
+ 1200.0
+"""
+
+
+def test_equal_temperament():
+    tuning = Tuning()
+    assert tuning.frequency(69) == 440
+    assert tuning.frequency(81) == pytest.approx(880)
+    assert tuning.frequency(60) == pytest.approx(261.6256, rel=1e-6)
+    assert list(tuning.freqs[:3]) == pytest.approx([8.1758, 8.6620, 9.1770], rel=1e-4)
+
+
+def test_bend_moves_between_notes():
+    tuning = Tuning()
+    assert tuning.bend(8192) == 0
+    assert tuning.bend(16383) == pytest.approx(2, rel=1e-3)
+    assert tuning.frequency(69, 1) == pytest.approx(tuning.frequency(70))
+    assert tuning.frequency(69, 0.5) == pytest.approx(440 * 2 ** (1 / 24))
+
+
+def test_scala_scale():
+    ratios = parse_scala(JUST)
+    assert ratios == pytest.approx([9 / 8, 5 / 4, 4 / 3, 3 / 2, 5 / 3, 15 / 8, 2])
+    tuning = Tuning(scale=ratios, root=60)
+    c4 = Tuning().frequency(60)
+    assert tuning.frequency(60) == pytest.approx(c4)
+    assert tuning.frequency(64) == pytest.approx(c4 * 3 / 2)
+    assert tuning.frequency(67) == pytest.approx(c4 * 2)
+    assert tuning.frequency(59) == pytest.approx(c4 * 15 / 16)
+
+
+def test_step_and_period_tables():
+    tuning = Tuning()
+    steps = tuning.steps(48000)
+    assert steps[69] == pytest.approx(2 * math.pi * 440 / 48000)
+    assert tuning.periods(48000)[81] == pytest.approx(48000 / 880)
+    assert tuning.steps(48000) is steps
+    assert not steps.flags.writeable
+    assert tuning.lookup("period", 440, 48000) == pytest.approx(48000 / 440)
+    assert tuning.lookup("step", 445, 48000) is None
+
+
+def saw(freq, amp, sample_rate):
+    return iter(Chain(SawtoothOscillator(freq, amp=amp, sample_rate=sample_rate)))
+
+
+def sine(freq, amp, sample_rate):
+    return iter(Chain(SineOscillator(freq, amp=amp, sample_rate=sample_rate), Volume()))
+
+
+@pytest.mark.parametrize("cls", [VoiceManager, VoicePool])
+def test_voices_take_their_steps_from_the_tables(cls):
+    tuning = Tuning(a4=432)
+    voices = cls(saw, tuning=tuning)
+    voices.note_on(57, 127)
+    osc = voices.notes[57][0].generator
+    if cls is VoicePool:
+        osc = osc.generator
+    assert osc._tuned == tuning.periods(44100)[57]
+    assert osc._period == osc._tuned
+
+    # Bent notes aren't in the tables, their steps are computed.
+    voices.pitch_bend(12000)
+    assert osc._tuned is None
+    assert osc.freq == pytest.approx(tuning.frequency(57, tuning.bend(12000)))
+
+
+def test_tuned_oscillator_sounds_the_same():
+    tuning = Tuning()
+    voice = sine(220, 1, 44100)
+    voice.retune(1, tuning)
+    assert voice.generator._step == tuning.steps(44100)[57]
+    np.testing.assert_allclose(
+        render_block(voice, 512), render_block(sine(220, 1, 44100), 512)
+    )
@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+
+from synth.components import (
+    ADSREnvelope,
+    Chain,
+    ModulatedOscillator,
+    ModulatedVolume,
+    SineOscillator,
+)
+from synth.mixer import Mixer
+from synth.voices import VoiceManager, VoicePool
+
+
+def voice(freq, amp, sample_rate):
+    osc = SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate)
+    env = ADSREnvelope(0.001, 0.01, 0.5, 2.0, sample_rate=sample_rate)
+    return iter(Chain(osc, ModulatedVolume(env)))
+
+
+def test_iterates_the_live_voices():
+    voices = VoiceManager(voice)
+    voices.mix(Mixer(64, 1), [(0, 0x90, 60, 100), (10, 0x90, 64, 100)])
+    assert list(voices) == [voices.notes[60][0], voices.notes[64][0]]
+
+
+def test_silent_released_voices_are_removed():
+    voices = VoiceManager(voice, silence_threshold=0.2)
+    mixer = Mixer(64, 1)
+    voices.mix(mixer, [(0, 0x90, 60, 100)])
+    voices.mix(mixer, [(0, 0x80, 60, 0)])
+    voices.remove_ended()
+    assert 60 in voices.notes
+
+    # The release is 2 seconds long, the voice is removed once
+    # it falls below the threshold long before it has ended.
+    for k in range(3 * 44100 // 64):
+        voices.mix(mixer)
+        voices.remove_ended()
+        if not voices:
+            break
+    assert not voices
+    assert k * 64 < 1.5 * 44100
+
+
+class Recorder:
+    # Records the sizes of the blocks a voice is rendered in.
+
+    def __init__(self, freq, amp, sample_rate):
+        self.osc = SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate)
+        self.sizes = []
+
+    def __iter__(self):
+        iter(self.osc)
+        return self
+
+    def __next__(self):
+        return self.next_block(1)[0]
+
+    def next_block(self, n):
+        self.sizes.append(n)
+        return self.osc.next_block(n)
+
+
+def recorder(freq, amp, sample_rate):
+    return iter(Recorder(freq, amp, sample_rate))
+
+
+def test_events_only_split_the_voices_they_change():
+    voices = VoiceManager(recorder)
+    mixer = Mixer(64, 1, amp_scale=1, max_amp=1)
+    voices.mix(mixer, [(0, 0x90, 60, 127)])
+    held = voices.notes[60][0]
+
+    voices.mix(mixer, [(10, 0x90, 64, 127)])
+    started = voices.notes[64][0]
+    voices.render(mixer, [(20, 0x80, 64, 0), (30, 0x90, 67, 127)])
+    assert held.sizes == [64, 64, 64]
+    assert started.sizes == [54, 20]
+    assert voices.notes[67][0].sizes == [34]
+
+
+def test_note_on_starts_at_its_offset():
+    voices = VoiceManager(recorder)
+    mixer = Mixer(64, 1)
+    voices.render(mixer, [(10, 0x90, 69, 127)])
+    acc = mixer._acc[:, 0]
+    expected = iter(SineOscillator(freq=440)).next_block(54)
+    assert not acc[:10].any()
+    np.testing.assert_allclose(acc[10:], expected, atol=1e-6)
+
+
+def test_pool_reuses_its_voices():
+    built = []
+
+    def counted(freq, amp, sample_rate):
+        built.append(freq)
+        return voice(freq, amp, sample_rate)
+
+    pool = VoicePool(counted, max_voices=2)
+    mixer = Mixer(64, 1)
+    voices = list(pool.pool)
+    for note in range(60, 72):
+        pool.mix(mixer, [(0, 0x90, note, 100)])
+        pool.mix(mixer, [(0, 0x80, note, 0)])
+    assert len(built) == 2
+    assert all(entry[0] in voices for entry in pool.notes.values())
+
+
+def test_pool_voice_matches_a_new_voice():
+    events = [(0, 0x90, 81, 100), (20, 0x90, 57, 64)]
+    mixers = [Mixer(64, 1), Mixer(64, 1)]
+    for voices, mixer in zip(
+        [VoiceManager(voice), VoicePool(voice, max_voices=4)], mixers
+    ):
+        voices.render(mixer, events)
+        voices.render(mixer)
+    np.testing.assert_allclose(mixers[0]._acc, mixers[1]._acc, atol=1e-5)
+
+
+@pytest.mark.parametrize(
+    "steal, stolen", [("oldest", 60), ("quietest", 64), ("released", 62)]
+)
+def test_pool_steal_policies(steal, stolen):
+    pool = VoicePool(voice, max_voices=3, steal=steal)
+    mixer = Mixer(64, 1)
+    pool.mix(mixer, [(0, 0x90, 60, 127), (0, 0x90, 62, 127), (0, 0x90, 64, 10)])
+    pool.mix(mixer, [(0, 0x80, 62, 0)])
+    pool.mix(mixer, [(0, 0x90, 67, 127)])
+    assert len(pool) == 3
+    assert set(pool.notes) == {60, 62, 64, 67} - {stolen}
+
+
+def test_pool_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        VoicePool(voice, steal="newest")
+
+
+def fm_voice(freq, amp, sample_rate):
+    carrier = SineOscillator(freq=freq, amp=amp, sample_rate=sample_rate)
+    modulator = SineOscillator(freq=2 * freq, sample_rate=sample_rate)
+    return iter(ModulatedOscillator(carrier, modulator, freq_mod=lambda f, v: f + v))
+
+
+def test_pool_does_not_retune_the_modulators():
+    # The limitation documented in VoicePool, the modulator
+    # of a pooled voice keeps the pitch of `ref_freq`.
+    pool = VoicePool(fm_voice, max_voices=1)
+    voices = VoiceManager(fm_voice)
+    for manager in (pool, voices):
+        manager.note_on(57, 127)
+    pooled = pool.notes[57][0].generator
+    built = voices.notes[57][0]
+    assert pooled.oscillator.freq == built.oscillator.freq == pytest.approx(220)
+    assert pooled.modulators[0].freq == 880
+    assert built.modulators[0].freq == 440
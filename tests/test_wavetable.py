@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from synth.components.blocks import render_block
+from synth.components.oscillators import SineOscillator, WavetableOscillator
+from synth.components.oscillators.wavetable_oscillator import get_wavetable
+
+
+def test_tables_are_shared():
+    a = WavetableOscillator(waveform="sawtooth")
+    b = WavetableOscillator(freq=220, waveform="sawtooth")
+    assert a._tables is b._tables
+    assert a._tables is get_wavetable("sawtooth", 2048, 44_100)
+    assert not a._tables.flags.writeable
+
+
+def test_tables_are_band_limited():
+    size = 2048
+    tables = get_wavetable("square", size, 44_100)
+    for k, table in enumerate(tables):
+        spectrum = np.abs(np.fft.rfft(table[:size]))
+        top = int(np.flatnonzero(spectrum > 1e-6 * spectrum.max()).max())
+        # No harmonic above Nyquist at the top note of the level,
+        # the last levels only keep the fundamental.
+        assert top <= max(1, 22_050 // (20 * 2 ** (k + 1)))
+
+
+def test_sine_matches_sine_oscillator():
+    expected = render_block(iter(SineOscillator(freq=440, phase=30)), 1000)
+    osc = iter(WavetableOscillator(freq=440, phase=30))
+    assert np.allclose(render_block(osc, 1000), expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("waveform", ["sine", "square", "sawtooth", "triangle"])
+def test_next_block_matches_next(waveform):
+    osc = iter(WavetableOscillator(freq=331, amp=0.7, waveform=waveform))
+    expected = np.array([next(osc) for _ in range(1600)])
+    osc = iter(WavetableOscillator(freq=331, amp=0.7, waveform=waveform))
+    blocks = np.concatenate([render_block(osc, 64) for _ in range(25)])
+    assert blocks.dtype == np.float32
+    assert np.allclose(blocks, expected, atol=1e-4)
+
+
+def test_table_follows_freq():
+    osc = iter(WavetableOscillator(freq=100, waveform="sawtooth"))
+    low = osc._table
+    osc.freq = 5000
+    assert osc._table is not low
+    assert len(osc._table) == 2050
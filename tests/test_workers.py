@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from synth.components import SawtoothOscillator
+from synth.mixer import Mixer
+from synth.voices import VoiceManager
+from synth.workers import VoiceWorkers
+
+
+def voice(freq, amp, sample_rate):
+    return iter(SawtoothOscillator(freq=freq, amp=amp, sample_rate=sample_rate))
+
+
+def test_import_synth_does_not_import_multiprocessing():
+    code = "import sys, synth; print('multiprocessing' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_workers_render_like_a_single_process():
+    buffers = [[(k * 7 % 64, 0x90, 48 + k, 100)] for k in range(12)]
+    buffers += [[(5, 0x80, 50, 0), (9, 0x80, 53, 0)]] + [[]] * 4
+
+    voices = VoiceManager(voice)
+    mixer = Mixer(64, 1)
+    expected = [voices.mix(mixer, events).copy() for events in buffers]
+
+    workers = VoiceWorkers(voice, num_samples=64, workers=3)
+    try:
+        mixer = Mixer(64, 1)
+        out = [workers.mix(mixer, events).copy() for events in buffers]
+        assert len(workers) == 10
+    finally:
+        workers.close()
+    diff = np.abs(np.concatenate(out).astype(int) - np.concatenate(expected))
+    assert diff.max() <= 1